@@ -0,0 +1,20 @@
+"""
+Helpers for running blocking and CPU-bound work from async code.
+Shared by the services and the profiling middleware.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+
+# True while the current request is being profiled
+profiling_active: ContextVar[bool] = ContextVar("profiling_active", default=False)
+
+
+async def run_blocking(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run blocking I/O in the threadpool.
+    Profiled requests still await it, so it shows up as await time.
+    """
+    return await run_in_threadpool(func, *args, **kwargs)
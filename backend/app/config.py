@@ -14,9 +14,38 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
     
     # Gemini API
     GEMINI_API_KEY: str
+    LLM_GENERATION_MODE: str = "combined"  # "combined" (one call) or "parallel" (two concurrent calls)
+    RELATED_TOPICS_SOURCE: str = "links"  # "links" (article link graph) or "llm"
+    RELATED_TOPICS_LLM_TIEBREAK: bool = False  # Let the LLM order link candidates tied at the cut-off
+    
+    # Admission control for LLM-bound requests (limits are per worker process)
+    GENERATION_MAX_CONCURRENCY: int = 4  # Cold generations running at once
+    GENERATION_MAX_QUEUE: int = 16  # Waiting generations before shedding with 503
+    GENERATION_QUEUE_TIMEOUT: int = 30  # Seconds a request may wait for a slot
+    
+    # Prefetch (background pre-generation of related-topic quizzes)
+    PREFETCH_ENABLED: bool = False  # Speculative related-topic prefetch; cache warming always works
+    PREFETCH_MAX_DEPTH: int = 1  # How many related-topic hops to follow from a user quiz
+    PREFETCH_MAX_PER_HOUR: int = 20  # Background generations per hour, per worker
+    PREFETCH_TOKEN_CAP: int = 200000  # LLM tokens per hour, per worker
+    PREFETCH_QUEUE_SIZE: int = 200
+    
+    # CPU offload for HTML parsing and entity extraction
+    CPU_POOL_WORKERS: int = 0  # Process-pool size per worker; 0 = parse in the threadpool
+    
+    # Profiling (middleware is not installed at all when disabled)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled without the header
+    PROFILING_TOKEN: str = ""  # X-Debug-Token value that triggers profiling and unlocks /admin and /api/quiz/warm
+    PROFILING_INTERVAL: float = 0.001  # Sampling interval in seconds
+    PROFILING_MAX_STORED: int = 50  # Profiles kept in memory per worker
     
     # Server
     HOST: str = "0.0.0.0"
@@ -25,6 +54,14 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    # Cache
+    CACHE_BACKEND: str = "local"  # "local" (in-process stand-in), "redis" or "none"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_TTL_SECONDS: int = 3600
+    CACHE_NEGATIVE_TTL_SECONDS: int = 30  # How long 404s are remembered
+    CACHE_LOCAL_MAX_ITEMS: int = 1024  # In-process LRU size (0 disables the tier)
+    CACHE_LOCAL_TTL_SECONDS: int = 5  # Kept short: other workers' deletes can't reach it
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
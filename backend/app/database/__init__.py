@@ -2,6 +2,6 @@
 Database package.
 Contains database connection and session management.
 """
-from app.database.connection import Base, engine, SessionLocal, get_db
+from app.database.connection import Base, engine, SessionLocal, get_db, pool_stats
 
-__all__ = ["Base", "engine", "SessionLocal", "get_db"]
+__all__ = ["Base", "engine", "SessionLocal", "get_db", "pool_stats"]
@@ -1,41 +1,141 @@
 """
 Database connection setup and session management.
-Creates SQLAlchemy engine and provides session factory.
+Creates an async SQLAlchemy engine and provides session factory.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+import time
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Map a plain database URL to its async driver.
+    postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://
+    URLs that already name a driver are left unchanged.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]  # Heroku/Render style
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+class PoolStats:
+    """
+    Connection pool gauges exposed on /metrics.
+    """
+
+    def __init__(self):
+        self.in_use = 0  # Connections currently checked out
+        self.waiting = 0  # Callers currently waiting for a connection
+        self.checkouts = 0  # Total successful checkouts
+        self.timeouts = 0  # Checkouts that hit DB_POOL_TIMEOUT
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def snapshot(self) -> dict:
+        pool = engine.sync_engine.pool
+        # SQLite uses SQLAlchemy's default pool, which may not be a queue pool
+        sized = isinstance(pool, AsyncAdaptedQueuePool)
+        return {
+            "pool_size": pool.size() if sized else None,
+            "checked_out": pool.checkedout() if sized else None,
+            "overflow": pool.overflow() if sized else None,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_wait_avg_ms": round(
+                1000 * self.wait_seconds_total / self.checkouts, 3
+            ) if self.checkouts else 0.0,
+            "checkout_wait_max_ms": round(1000 * self.wait_seconds_max, 3)
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long callers wait for a connection.
+    """
+
+    def _do_get(self):
+        pool_stats.waiting += 1
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.waiting -= 1
+        waited = time.perf_counter() - start
+        pool_stats.wait_seconds_total += waited
+        pool_stats.wait_seconds_max = max(pool_stats.wait_seconds_max, waited)
+        return conn
+
+
+DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
+
+# Pool sizing only applies to server databases. SQLite keeps SQLAlchemy's
+# default pool: a queue pool would give each ":memory:" connection its own
+# empty database.
+if DATABASE_URL.startswith("sqlite"):
+    pool_options = {}
+else:
+    pool_options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,  # Connection pool size
+        "max_overflow": settings.DB_MAX_OVERFLOW,  # Max overflow connections
+        "pool_timeout": settings.DB_POOL_TIMEOUT,  # Seconds to wait for a free connection
+        "pool_recycle": settings.DB_POOL_RECYCLE  # Replace connections older than this
+    }
 
 # Create database engine
 # echo=True shows SQL queries in console (useful for debugging)
-engine = create_engine(
-    settings.DATABASE_URL,
+engine = create_async_engine(
+    DATABASE_URL,
     echo=False,  # Set to True for SQL query logging
     pool_pre_ping=True,  # Verify connections before using them
-    pool_size=10,  # Connection pool size
-    max_overflow=20  # Max overflow connections
+    **pool_options
 )
 
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.in_use += 1
+    pool_stats.checkouts += 1
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats.in_use = max(0, pool_stats.in_use - 1)
+
+
 # Session factory for database operations
-SessionLocal = sessionmaker(
-    autocommit=False,
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
     autoflush=False,
-    bind=engine
+    expire_on_commit=False  # Keep loaded attributes usable after commit
 )
 
 # Base class for SQLAlchemy models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
     Dependency function to get database session.
     Used with FastAPI's dependency injection system.
     Ensures proper session cleanup after each request.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -5,8 +5,15 @@ Initializes the app, configures middleware, and registers routes.
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routes import quiz
+from app.routes import quiz, admin
+from app.middleware.profiling import ProfilingMiddleware, profile_store
 from app.models.database import init_db
+from app.database.connection import engine, pool_stats
+from app.services.cache import quiz_cache
+from app.services.prefetcher import quiz_prefetcher
+from app.services.llm_service import latency_model
+from app.services.admission import admission_controller
+from app.services.cpu_pool import shutdown_executor
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,8 +34,18 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Opt-in request profiling; nothing is added to the stack when disabled
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL
+    )
+
 # Register routes
 app.include_router(quiz.router)
+app.include_router(admin.router)
 
 # Initialize database tables on startup
 @app.on_event("startup")
@@ -37,11 +54,24 @@ async def startup_event():
     Run on application startup.
     Creates database tables if they don't exist.
     """
-    init_db()
+    await init_db()
     print("✅ Database tables initialized")
+    await quiz_prefetcher.start()
+    print("✅ Background prefetcher started")
     print(f"✅ Server running on {settings.HOST}:{settings.PORT}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Run on application shutdown.
+    Stops background work, the CPU process pool and pooled database connections.
+    """
+    await quiz_prefetcher.stop()
+    shutdown_executor()
+    await engine.dispose()
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -56,6 +86,28 @@ async def health_check():
     }
 
 
+# Metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    """
+    Runtime gauges for capacity monitoring.
+    Reports database pool usage, cache hit rates, generation queue depth
+    and shed counts for this worker.
+    """
+    return {
+        "db_pool": pool_stats.snapshot(),
+        "cache": dict(quiz_cache.stats),
+        "admission": admission_controller.snapshot(),
+        "prefetch": quiz_prefetcher.snapshot(),
+        "llm_latency_model": {
+            "tokens_per_question": round(latency_model.tokens_per_question, 1),
+            "first_token_seconds": round(latency_model.first_token_seconds, 3),
+            "tokens_per_second": round(latency_model.tokens_per_second, 1),
+            "samples": latency_model.samples
+        }
+    }
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -66,9 +118,13 @@ async def root():
         "message": "AI Wiki Quiz Generator API",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "endpoints": {
             "generate_quiz": "POST /api/quiz/generate",
             "get_history": "GET /api/quiz/history",
-            "get_quiz_details": "GET /api/quiz/{quiz_id}"
+            "get_quiz_details": "GET /api/quiz/{quiz_id}",
+            "regenerate_questions": "POST /api/quiz/{quiz_id}/questions/regenerate",
+            "add_questions": "POST /api/quiz/{quiz_id}/questions",
+            "warm_cache": "POST /api/quiz/warm"
         }
     }
@@ -0,0 +1,7 @@
+"""
+Middleware package.
+Contains ASGI middleware used by the application.
+"""
+from app.middleware.profiling import ProfilingMiddleware, profile_store
+
+__all__ = ["ProfilingMiddleware", "profile_store"]
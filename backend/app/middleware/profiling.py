@@ -0,0 +1,143 @@
+"""
+Opt-in per-request profiling.
+Profiles a request with pyinstrument (a low-overhead sampling profiler) when
+it carries the debug token header or the sampling rate fires, and keeps the
+result in memory for retrieval as speedscope JSON via /admin/profiles.
+The middleware is only installed when PROFILING_ENABLED is true.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import hmac
+import random
+import time
+import uuid
+
+from app.concurrency import profiling_active
+from app.config import settings
+
+
+DEBUG_TOKEN_HEADER = "x-debug-token"
+PROFILE_ID_HEADER = "x-profile-id"
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """Check a debug token against PROFILING_TOKEN (never matches if unset)."""
+    if not settings.PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+class ProfileStore:
+    """
+    Bounded in-memory store of recent profiles (oldest evicted first).
+    Sessions are rendered to speedscope JSON only when downloaded.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(
+        self,
+        profile_id: str,
+        session: Any,
+        method: str,
+        path: str,
+        status: Optional[int],
+        duration_ms: float,
+        trigger: str
+    ) -> None:
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "trigger": trigger,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "session": session
+        }
+        while len(self._profiles) > self.max_items:
+            self._profiles.popitem(last=False)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return [
+            {k: v for k, v in profile.items() if k != "session"}
+            for profile in reversed(self._profiles.values())
+        ]
+
+    def render_speedscope(self, profile_id: str) -> Optional[str]:
+        profile = self._profiles.get(profile_id)
+        if profile is None:
+            return None
+        from pyinstrument.renderers import SpeedscopeRenderer
+        return SpeedscopeRenderer().render(profile["session"])
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware; unprofiled requests pass straight through.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float, interval: float):
+        # Imported here so pyinstrument is only required when profiling is enabled
+        from pyinstrument import Profiler
+
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._profiler_class = Profiler
+
+    def _trigger(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == DEBUG_TOKEN_HEADER.encode():
+                return "header" if is_authorized(value.decode("latin-1")) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/profiles"):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status: Dict[str, int] = {}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.encode(), profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = self._profiler_class(interval=self.interval, async_mode="enabled")
+        token = profiling_active.set(True)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            session = profiler.stop()
+            profiling_active.reset(token)
+            self.store.add(
+                profile_id,
+                session,
+                method=scope["method"],
+                path=scope["path"],
+                status=status.get("code"),
+                duration_ms=1000 * (time.perf_counter() - start),
+                trigger=trigger
+            )
+
+
+# Global profile store
+profile_store = ProfileStore(max_items=settings.PROFILING_MAX_STORED)
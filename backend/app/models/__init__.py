@@ -2,6 +2,6 @@
 Database models package.
 Imports all models for easy access.
 """
-from app.models.database import Quiz, QuizQuestion, RelatedTopic, init_db
+from app.models.database import Quiz, QuizQuestion, RelatedTopic, ArticleLink, init_db
 
-__all__ = ["Quiz", "QuizQuestion", "RelatedTopic", "init_db"]
+__all__ = ["Quiz", "QuizQuestion", "RelatedTopic", "ArticleLink", "init_db"]
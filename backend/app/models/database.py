@@ -21,12 +21,15 @@ class Quiz(Base):
     key_entities = Column(JSON, nullable=True)  # {people: [], organizations: [], locations: []}
     sections = Column(JSON, nullable=True)  # List of section titles
     raw_html = Column(Text, nullable=True)  # BONUS: Store raw HTML
+    llm_tokens_used = Column(Integer, nullable=True)  # Tokens spent generating this quiz
+    generation_ms = Column(Integer, nullable=True)  # Wall time of the generate request
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     questions = relationship("QuizQuestion", back_populates="quiz", cascade="all, delete-orphan")
     related_topics = relationship("RelatedTopic", back_populates="quiz", cascade="all, delete-orphan")
+    links = relationship("ArticleLink", back_populates="quiz", cascade="all, delete-orphan")
 
 
 class QuizQuestion(Base):
@@ -51,23 +54,71 @@ class QuizQuestion(Base):
 
 class RelatedTopic(Base):
     """
-    Related Wikipedia topics suggested by LLM.
+    Related Wikipedia topics, ranked from the link graph (or suggested by LLM).
     """
     __tablename__ = "related_topics"
     
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
     topic = Column(String(200), nullable=False)
+    url = Column(String(500), nullable=True)  # Wikipedia URL when resolved from links
     
     # Relationship
     quiz = relationship("Quiz", back_populates="related_topics")
 
 
+class ArticleLink(Base):
+    """
+    Internal wiki links found in a quiz's article (the link graph).
+    One row per (quiz, target article).
+    """
+    __tablename__ = "article_links"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    target_title = Column(String(300), nullable=False)
+    target_url = Column(String(500), nullable=False, index=True)
+    lead_count = Column(Integer, nullable=False, default=0)  # Occurrences in the lead section
+    total_count = Column(Integer, nullable=False, default=0)  # Occurrences in the whole article
+    
+    # Relationship
+    quiz = relationship("Quiz", back_populates="links")
+
+
 # Create all tables
-def init_db():
+# Columns added to tables that already exist in deployed databases.
+# create_all only creates missing tables, so these are added by init_db.
+ADDED_COLUMNS = [
+    ("quizzes", "llm_tokens_used", "INTEGER"),
+    ("quizzes", "generation_ms", "INTEGER"),
+    ("related_topics", "url", "VARCHAR(500)"),
+]
+
+
+def add_missing_columns(conn):
+    """
+    Add any ADDED_COLUMNS missing from existing tables (idempotent).
+    """
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(conn)
+    # Postgres supports IF NOT EXISTS, which is safe with several workers starting at once
+    if_not_exists = "IF NOT EXISTS " if conn.dialect.name == "postgresql" else ""
+    for table, column, column_type in ADDED_COLUMNS:
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN {if_not_exists}{column} {column_type}"
+            ))
+            print(f"✅ Added column {table}.{column}")
+
+
+async def init_db():
     """
     Initialize database tables.
     Call this when starting the application.
     """
     from app.database.connection import engine
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
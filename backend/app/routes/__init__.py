@@ -2,6 +2,6 @@
 API routes package.
 Contains all API endpoint definitions.
 """
-from app.routes import quiz
+from app.routes import quiz, admin
 
-__all__ = ["quiz"]
+__all__ = ["quiz", "admin"]
@@ -0,0 +1,44 @@
+"""
+Admin routes.
+Debug endpoints guarded by the X-Debug-Token header.
+"""
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from typing import List, Optional
+from app.middleware.profiling import profile_store, is_authorized
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_debug_token(token: Optional[str]) -> None:
+    """
+    Reject requests without a valid debug token.
+    """
+    if not is_authorized(token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid debug token")
+
+
+@router.get("/profiles")
+async def list_profiles(x_debug_token: Optional[str] = Header(None)) -> List[dict]:
+    """
+    List stored request profiles, newest first.
+    """
+    require_debug_token(x_debug_token)
+    return profile_store.summaries()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_debug_token: Optional[str] = Header(None)):
+    """
+    Download one profile as speedscope JSON (open it at https://www.speedscope.app).
+    """
+    require_debug_token(x_debug_token)
+    
+    content = profile_store.render_speedscope(profile_id)
+    if content is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'}
+    )
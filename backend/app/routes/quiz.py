@@ -2,28 +2,44 @@
 API routes for quiz operations.
 Handles quiz generation, retrieval, and history.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from typing import List, Optional
 from app.database.connection import get_db
-from app.models.database import Quiz, QuizQuestion, RelatedTopic
+from app.models.database import Quiz, QuizQuestion
 from app.schemas.quiz import (
     QuizGenerateRequest,
+    QuestionRegenerateRequest,
+    QuestionAppendRequest,
+    QuizWarmRequest,
+    QuizWarmResponse,
     QuizResponse,
     QuizListItem,
-    QuestionSchema,
-    KeyEntitiesSchema,
     ErrorResponse
 )
-from app.services.scraper import WikipediaScraper
+from app.services.scraper import extract_article_text, normalize_article_url
 from app.services.llm_service import QuizGenerator
-from app.services.entity_extractor import EntityExtractor
+from app.services.cache import quiz_cache, quiz_key, quiz_url_key, HISTORY_KEY, NOT_FOUND
+from app.services.quiz_builder import (
+    find_existing_quiz,
+    create_quiz,
+    cache_quiz_response,
+    get_quiz_questions,
+    format_quiz_response
+)
+from app.services.prefetcher import quiz_prefetcher
+from app.services.admission import admission_controller, QueueFullError
+from app.services.cpu_pool import run_cpu
+from app.routes.admin import require_debug_token
 
 router = APIRouter(prefix="/api/quiz", tags=["Quiz"])
 
 
 @router.post("/generate", response_model=QuizResponse, status_code=status.HTTP_201_CREATED)
-async def generate_quiz(request: QuizGenerateRequest, db: Session = Depends(get_db)):
+async def generate_quiz(request: QuizGenerateRequest, db: AsyncSession = Depends(get_db)):
     print(f"DEBUG: Generate request received for URL: {request.url}") # ADD THIS
     """
     Generate a new quiz from Wikipedia URL.
@@ -33,168 +49,323 @@ async def generate_quiz(request: QuizGenerateRequest, db: Session = Depends(get_
     2. Check if URL already processed (BONUS: caching)
     3. Scrape Wikipedia article
     4. Extract entities
-    5. Generate quiz using LLM
-    6. Generate related topics
-    7. Store in database
-    8. Return response
+    5. Generate quiz and related topics using LLM
+    6. Store in database
+    7. Return response
     """
     try:
         # BONUS: Check if URL already exists (caching)
-        existing_quiz = db.query(Quiz).filter(Quiz.url == request.url).first()
-        if existing_quiz:
+        existing = await find_existing_quiz(request.url, db)
+        if existing is not None:
             # Return cached quiz
-            return format_quiz_response(existing_quiz, db)
-        
-        # Step 1: Scrape Wikipedia
-        scraper = WikipediaScraper(request.url)
-        scraped_data = scraper.scrape()
-        
-        # Step 2: Extract entities
-        entities = EntityExtractor.extract_entities(
-            scraped_data['full_text'],
-            scraped_data['sections']
-        )
-        
-        # Step 3: Generate quiz using LLM
-        quiz_generator = QuizGenerator()
-        questions = quiz_generator.generate_quiz(
-            title=scraped_data['title'],
-            content=scraped_data['full_text'],
-            num_questions=7
-        )
-        
-        # Step 4: Generate related topics
-        related_topics = quiz_generator.generate_related_topics(
-            title=scraped_data['title'],
-            summary=scraped_data['summary']
-        )
-        
-        # Step 5: Store in database
-        quiz = Quiz(
-            url=request.url,
-            title=scraped_data['title'],
-            summary=scraped_data['summary'],
-            key_entities=entities,
-            sections=scraped_data['sections'],
-            raw_html=scraped_data['raw_html']  # BONUS: Store raw HTML
-        )
-        db.add(quiz)
-        db.flush()  # Get quiz.id before adding questions
-        
-        # Add questions
-        for q in questions:
-            question = QuizQuestion(
-                quiz_id=quiz.id,
-                question=q['question'],
-                options=q['options'],
-                answer=q['answer'],
-                difficulty=q['difficulty'],
-                explanation=q.get('explanation', '')
-            )
-            db.add(question)
+            return existing
         
-        # Add related topics
-        for topic in related_topics:
-            related = RelatedTopic(quiz_id=quiz.id, topic=topic)
-            db.add(related)
+        # Don't hold a DB connection while queued for a generation slot
+        await db.commit()
         
-        db.commit()
-        db.refresh(quiz)
+        # Cold generation: admitted through the bounded queue;
+        # background prefetch work waits until this finishes
+        async with quiz_prefetcher.live_request():
+            async with admission_controller.admit():
+                response = await create_quiz(
+                    request.url,
+                    db,
+                    num_questions=request.num_questions,
+                    max_latency_ms=request.max_latency_ms,
+                    max_output_tokens=request.max_output_tokens
+                )
         
-        return format_quiz_response(quiz, db)
+        # Speculatively pre-generate the related topics users are likely to click next
+        quiz_prefetcher.schedule_related(response)
+        return response
     
+    except QueueFullError as e:
+        raise busy_error(e)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IntegrityError:
+        # Same URL was stored concurrently (e.g. by the prefetcher); return that one
+        await db.rollback()
+        existing = await find_existing_quiz(request.url, db)
+        if existing is not None:
+            return existing
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate quiz: concurrent write conflict"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate quiz: {str(e)}"
         )
 
 
+@router.post("/warm", response_model=QuizWarmResponse, status_code=status.HTTP_202_ACCEPTED)
+async def warm_quizzes(request: QuizWarmRequest, x_debug_token: Optional[str] = Header(None)):
+    """
+    Queue Wikipedia URLs for background generation (cache warming).
+    Returns immediately; work runs at low priority within the prefetch budget.
+    Requires the X-Debug-Token header, since queued work spends the shared budget.
+    """
+    require_debug_token(x_debug_token)
+    
+    for url in request.urls:
+        if not url.startswith("https://en.wikipedia.org/wiki/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not a Wikipedia article URL: {url}"
+            )
+    
+    queued = quiz_prefetcher.warm(request.urls)
+    return {"queued": queued, "pending": quiz_prefetcher.queue.qsize()}
+
+
 @router.get("/history", response_model=List[QuizListItem])
-async def get_quiz_history(db: Session = Depends(get_db)):
+async def get_quiz_history(db: AsyncSession = Depends(get_db)):
     
     """
     Get list of all past quizzes.
     Returns summary information for history table.
     """
-    quizzes = db.query(Quiz).order_by(Quiz.created_at.desc()).all()
+    cached = await quiz_cache.get(HISTORY_KEY)
+    if cached is not None and cached is not NOT_FOUND:
+        return cached
+    
+    # One grouped query instead of a COUNT per quiz
+    question_counts = (
+        select(QuizQuestion.quiz_id, func.count(QuizQuestion.id).label("question_count"))
+        .group_by(QuizQuestion.quiz_id)
+        .subquery()
+    )
+    rows = await db.execute(
+        select(
+            Quiz.id,
+            Quiz.url,
+            Quiz.title,
+            Quiz.created_at,
+            func.coalesce(question_counts.c.question_count, 0)
+        )
+        .outerjoin(question_counts, question_counts.c.quiz_id == Quiz.id)
+        .order_by(Quiz.created_at.desc())
+    )
     
     result = []
-    for quiz in quizzes:
-        question_count = db.query(QuizQuestion).filter(QuizQuestion.quiz_id == quiz.id).count()
+    for quiz_id, url, title, created_at, question_count in rows:
         result.append({
-            'id': quiz.id,
-            'url': quiz.url,
-            'title': quiz.title,
-            'created_at': quiz.created_at,
+            'id': quiz_id,
+            'url': url,
+            'title': title,
+            'created_at': created_at,
             'question_count': question_count
         })
     
+    await quiz_cache.set(HISTORY_KEY, result)
     return result
 
 
 @router.get("/{quiz_id}", response_model=QuizResponse)
-async def get_quiz_details(quiz_id: int, db: Session = Depends(get_db)):
+async def get_quiz_details(quiz_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get full details of a specific quiz.
     Used when clicking "Details" in history table.
     """
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    cached = await quiz_cache.get(quiz_key(quiz_id))
+    if cached is NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    if cached is not None:
+        return cached
+    
+    quiz = await db.get(Quiz, quiz_id, options=[defer(Quiz.raw_html)])
     
     if not quiz:
+        await quiz_cache.set_not_found(quiz_key(quiz_id))
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
     
-    return format_quiz_response(quiz, db)
+    response = await format_quiz_response(quiz, db)
+    await cache_quiz_response(response)
+    return response
+
+
+@router.post("/{quiz_id}/questions/regenerate", response_model=QuizResponse)
+async def regenerate_questions(
+    quiz_id: int,
+    request: QuestionRegenerateRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Replace selected questions of a stored quiz.
+    Reuses the stored article HTML and sends a small targeted prompt,
+    so fixing one bad question doesn't cost a full regeneration.
+    Replaced rows keep their IDs and difficulty.
+    """
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    
+    questions = await get_quiz_questions(quiz.id, db)
+    by_id = {q.id: q for q in questions}
+    missing = [qid for qid in request.question_ids if qid not in by_id]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Questions not found in quiz {quiz_id}: {missing}"
+        )
+    
+    targets = [by_id[qid] for qid in dict.fromkeys(request.question_ids)]
+    
+    # Release the pooled connection while re-parsing and waiting on the LLM
+    await db.commit()
+    content = await load_article_content(quiz)
+    
+    try:
+        async with quiz_prefetcher.live_request():
+            async with admission_controller.admit():
+                new_questions = await QuizGenerator().generate_additional_questions(
+                    title=quiz.title,
+                    content=content,
+                    existing_questions=[q.question for q in questions],
+                    num_questions=len(targets),
+                    difficulties=[q.difficulty for q in targets]
+                )
+        if len(new_questions) < len(targets):
+            # Replace all or nothing, so the response never mixes old and new silently
+            raise Exception(
+                f"LLM returned {len(new_questions)} usable questions for {len(targets)} requested"
+            )
+        
+        # Update rows in place so question IDs and ordering stay stable
+        for row, q in zip(targets, new_questions):
+            row.question = q['question']
+            row.options = q['options']
+            row.answer = q['answer']
+            row.difficulty = q['difficulty']
+            row.explanation = q.get('explanation', '')
+        
+        await db.commit()
+        response = await format_quiz_response(quiz, db)
+        await cache_quiz_response(response)
+        return response
+    
+    except QueueFullError as e:
+        raise busy_error(e)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to regenerate questions: {str(e)}"
+        )
+
+
+@router.post("/{quiz_id}/questions", response_model=QuizResponse, status_code=status.HTTP_201_CREATED)
+async def add_questions(
+    quiz_id: int,
+    request: QuestionAppendRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Append new questions to a stored quiz.
+    Optionally restricted to one difficulty tier and/or one article section.
+    """
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    
+    if request.section and request.section not in (quiz.sections or []):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Section '{request.section}' not found in quiz {quiz_id}"
+        )
+    
+    questions = await get_quiz_questions(quiz.id, db)
+    
+    # Release the pooled connection while re-parsing and waiting on the LLM
+    await db.commit()
+    content = await load_article_content(quiz, request.section)
+    
+    try:
+        async with quiz_prefetcher.live_request():
+            async with admission_controller.admit():
+                new_questions = await QuizGenerator().generate_additional_questions(
+                    title=quiz.title,
+                    content=content,
+                    existing_questions=[q.question for q in questions],
+                    num_questions=request.count,
+                    difficulties=[request.difficulty] * request.count if request.difficulty else None
+                )
+        if not new_questions:
+            raise Exception("LLM returned no usable questions")
+        
+        for q in new_questions:
+            db.add(QuizQuestion(
+                quiz_id=quiz.id,
+                question=q['question'],
+                options=q['options'],
+                answer=q['answer'],
+                difficulty=q['difficulty'],
+                explanation=q.get('explanation', ''),
+                section_reference=request.section
+            ))
+        
+        await db.commit()
+        response = await format_quiz_response(quiz, db)
+        await cache_quiz_response(response)
+        await quiz_cache.delete(HISTORY_KEY)  # question_count changed
+        return response
+    
+    except QueueFullError as e:
+        raise busy_error(e)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to add questions: {str(e)}"
+        )
 
 
 @router.delete("/{quiz_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_quiz(quiz_id: int, db: Session = Depends(get_db)):
+async def delete_quiz(quiz_id: int, db: AsyncSession = Depends(get_db)):
     """
     Delete a quiz and all associated data.
     """
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id, options=[defer(Quiz.raw_html)])
     
     if not quiz:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
     
-    db.delete(quiz)
-    db.commit()
+    url = quiz.url
+    await db.delete(quiz)
+    await db.commit()
     
+    await quiz_cache.delete(quiz_key(quiz_id), quiz_url_key(normalize_article_url(url)), HISTORY_KEY)
     return None
 
 
-def format_quiz_response(quiz: Quiz, db: Session) -> QuizResponse:
+def busy_error(error: QueueFullError) -> HTTPException:
     """
-    Helper function to format quiz database model into response schema.
+    503 response for requests shed by admission control.
     """
-    # Get questions
-    questions = db.query(QuizQuestion).filter(QuizQuestion.quiz_id == quiz.id).all()
-    question_list = [
-        QuestionSchema(
-            question=q.question,
-            options=q.options,
-            answer=q.answer,
-            difficulty=q.difficulty,
-            explanation=q.explanation
-        )
-        for q in questions
-    ]
-    
-    # Get related topics
-    topics = db.query(RelatedTopic).filter(RelatedTopic.quiz_id == quiz.id).all()
-    topic_list = [t.topic for t in topics]
-    
-    return QuizResponse(
-        id=quiz.id,
-        url=quiz.url,
-        title=quiz.title,
-        summary=quiz.summary,
-        key_entities=KeyEntitiesSchema(**quiz.key_entities) if quiz.key_entities else None,
-        sections=quiz.sections or [],
-        quiz=question_list,
-        related_topics=topic_list,
-        created_at=quiz.created_at
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy generating quizzes, please retry shortly",
+        headers={"Retry-After": str(error.retry_after)}
     )
+
+
+async def load_article_content(quiz: Quiz, section: Optional[str] = None) -> str:
+    """
+    Rebuild article text from the stored raw HTML (no network fetch).
+    When a section is given, only that section's text is returned; raises 404
+    if it can't be found, so questions are never mislabeled with the section.
+    Parsing runs in the CPU process pool when enabled.
+    """
+    text = ""
+    if quiz.raw_html:
+        text = await run_cpu(extract_article_text, quiz.url, quiz.raw_html, section)
+    
+    if section and not text:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Text for section '{section}' not found in the stored article"
+        )
+    return text or quiz.summary or ""
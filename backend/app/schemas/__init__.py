@@ -5,7 +5,12 @@ Imports all schemas for easy access.
 from app.schemas.quiz import (
     QuestionSchema,
     KeyEntitiesSchema,
+    RelatedTopicSchema,
     QuizGenerateRequest,
+    QuestionRegenerateRequest,
+    QuestionAppendRequest,
+    QuizWarmRequest,
+    QuizWarmResponse,
     QuizResponse,
     QuizListItem,
     ErrorResponse
@@ -14,7 +19,12 @@ from app.schemas.quiz import (
 __all__ = [
     "QuestionSchema",
     "KeyEntitiesSchema",
+    "RelatedTopicSchema",
     "QuizGenerateRequest",
+    "QuestionRegenerateRequest",
+    "QuestionAppendRequest",
+    "QuizWarmRequest",
+    "QuizWarmResponse",
     "QuizResponse",
     "QuizListItem",
     "ErrorResponse"
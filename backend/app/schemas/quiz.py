@@ -9,6 +9,7 @@ from datetime import datetime
 
 class QuestionSchema(BaseModel):
     """Schema for a single quiz question"""
+    id: Optional[int] = None
     question: str
     options: List[str] = Field(..., min_length=4, max_length=4)
     answer: str
@@ -24,9 +25,47 @@ class KeyEntitiesSchema(BaseModel):
     locations: List[str] = []
 
 
+class RelatedTopicSchema(BaseModel):
+    """Schema for a related topic with its Wikipedia URL (if resolved)"""
+    topic: str
+    url: Optional[str] = None
+
+
 class QuizGenerateRequest(BaseModel):
     """Request schema for generating a quiz"""
     url: str = Field(..., description="Wikipedia article URL")
+    num_questions: Optional[int] = Field(
+        None, ge=1, le=20, description="Questions to generate (default: sized to the article)"
+    )
+    max_latency_ms: Optional[int] = Field(
+        None, ge=1000, description="Latency budget; fewer questions are generated to meet it"
+    )
+    max_output_tokens: Optional[int] = Field(
+        None, ge=256, le=8192, description="Cap on LLM output tokens"
+    )
+
+
+class QuestionRegenerateRequest(BaseModel):
+    """Request schema for replacing selected questions of a stored quiz"""
+    question_ids: List[int] = Field(..., min_length=1, description="IDs of questions to replace")
+
+
+class QuestionAppendRequest(BaseModel):
+    """Request schema for adding questions to a stored quiz"""
+    count: int = Field(1, ge=1, le=10, description="Number of questions to add")
+    difficulty: Optional[str] = Field(None, pattern="^(easy|medium|hard)$")
+    section: Optional[str] = Field(None, description="Article section to focus on")
+
+
+class QuizWarmRequest(BaseModel):
+    """Request schema for warming the quiz cache from a list of URLs"""
+    urls: List[str] = Field(..., min_length=1, description="Wikipedia article URLs")
+
+
+class QuizWarmResponse(BaseModel):
+    """Response schema for cache warming"""
+    queued: int
+    pending: int
 
 
 class QuizResponse(BaseModel):
@@ -39,6 +78,9 @@ class QuizResponse(BaseModel):
     sections: List[str] = []
     quiz: List[QuestionSchema] = []
     related_topics: List[str] = []
+    related_topic_links: List[RelatedTopicSchema] = []
+    llm_tokens_used: Optional[int] = None
+    generation_ms: Optional[int] = None
     created_at: Optional[datetime] = None
     
     class Config:
@@ -0,0 +1,165 @@
+"""
+Admission control for LLM-bound work.
+Cold generations run under a concurrency cap with a small, bounded priority
+queue in front of it. When the queue is full, requests are shed immediately
+with a Retry-After hint instead of piling up behind slow LLM calls, so cache
+hits and read endpoints (which never enter the queue) stay fast.
+"""
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+import asyncio
+import itertools
+import math
+import time
+
+from app.config import settings
+
+
+# Lower number = admitted first
+LIVE_PRIORITY = 0
+BACKGROUND_PRIORITY = 10
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a request can't be admitted.
+    Carries the number of seconds the client should wait before retrying.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency cap plus bounded priority queue for one worker process.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._avg_hold_seconds = 10.0  # EWMA of how long a slot is held
+        self.stats = {
+            "admitted": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+            "evicted": 0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a slot frees up for a new request."""
+        rounds = (self.queue_depth + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(rounds * self._avg_hold_seconds))
+
+    @asynccontextmanager
+    async def admit(self, priority: int = LIVE_PRIORITY):
+        """
+        Hold a generation slot for the duration of the block.
+        Raises QueueFullError if the request is shed.
+        """
+        await self._acquire(priority)
+        self.stats["admitted"] += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - start
+            self._avg_hold_seconds += 0.2 * (held - self._avg_hold_seconds)
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrency and self.queue_depth == 0:
+            self._active += 1
+            return
+
+        if self.queue_depth >= self.max_queue and not self._evict_lower_than(priority):
+            self.stats["shed_queue_full"] += 1
+            raise QueueFullError(self.retry_after())
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), fut)
+        self._waiters.append(entry)
+        try:
+            # shield: a timeout must not cancel a slot that was just granted
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(fut):
+                return
+            self.stats["shed_timeout"] += 1
+            raise QueueFullError(self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued; an eviction must not replace the cancellation
+            try:
+                granted = not self._abandon(fut)
+            except QueueFullError:
+                granted = False
+            if granted:
+                self._release()
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+
+    def _abandon(self, fut: asyncio.Future) -> bool:
+        """
+        Give up a queued future. Returns False if a slot was already granted.
+        Re-raises QueueFullError if the waiter was evicted.
+        """
+        if fut.done():
+            if fut.cancelled():
+                return True
+            fut.result()  # Raises QueueFullError for evicted waiters
+            return False
+        fut.cancel()
+        return True
+
+    def _evict_lower_than(self, priority: int) -> bool:
+        """
+        Make room for a higher-priority request by shedding the
+        lowest-priority, most recent waiter.
+        """
+        pending = [w for w in self._waiters if not w[2].done()]
+        if not pending:
+            return False
+        victim = max(pending, key=lambda w: (w[0], w[1]))
+        if victim[0] <= priority:
+            return False
+        victim[2].set_exception(QueueFullError(self.retry_after()))
+        self.stats["evicted"] += 1
+        return True
+
+    def _release(self) -> None:
+        """Hand the slot to the best waiter, or free it."""
+        pending = [w for w in self._waiters if not w[2].done()]
+        if pending:
+            best = min(pending, key=lambda w: (w[0], w[1]))
+            best[2].set_result(True)  # Slot passes directly; _active unchanged
+        else:
+            self._active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_hold_seconds": round(self._avg_hold_seconds, 2)
+        }
+
+
+# Global admission controller (limits apply per worker process)
+admission_controller = AdmissionController(
+    max_concurrency=settings.GENERATION_MAX_CONCURRENCY,
+    max_queue=settings.GENERATION_MAX_QUEUE,
+    queue_timeout=settings.GENERATION_QUEUE_TIMEOUT
+)
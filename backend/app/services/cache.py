@@ -0,0 +1,259 @@
+"""
+Two-tier cache for quiz read paths.
+A small in-process LRU sits in front of a shared backend (Redis in production,
+an in-memory stand-in for local development and tests) so every uvicorn
+worker and pod sees the same warm data instead of hitting Postgres.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import json
+import threading
+import time
+
+from app.config import settings
+
+
+# Returned by QuizCache.get() when a "not found" result was cached
+NOT_FOUND = object()
+
+# JSON marker stored for negative cache entries
+_NOT_FOUND_MARKER = {"__not_found__": True}
+
+HISTORY_KEY = "quiz:history"
+
+
+def quiz_key(quiz_id: int) -> str:
+    """Cache key for a formatted quiz response."""
+    return f"quiz:{quiz_id}"
+
+
+def quiz_url_key(url: str) -> str:
+    """Cache key mapping an article URL to its quiz ID."""
+    return f"quiz:url:{url}"
+
+
+class CacheBackend(ABC):
+    """
+    Interface for the shared cache tier.
+    Values are JSON strings; ttl is in seconds.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+
+class NullCacheBackend(CacheBackend):
+    """
+    Backend that never stores anything.
+    Useful for benchmarking the database path on its own.
+    """
+
+    async def get(self, key: str) -> Optional[str]:
+        return None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        return None
+
+    async def delete(self, *keys: str) -> None:
+        return None
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-memory stand-in for Redis.
+    Only shared within one process; use it for local development and tests.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared cache tier backed by any Redis-protocol server
+    (Redis, Valkey, KeyDB, managed Redis, ...).
+    """
+
+    def __init__(self, url: str):
+        # Imported lazily so the redis package is only needed when enabled
+        import redis.asyncio as redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU with per-entry expiry.
+    Kept short-lived because deletes in other workers can't reach it.
+    """
+
+    def __init__(self, max_items: int, ttl: int):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class QuizCache:
+    """
+    Read-through cache used by the quiz routes.
+    Lookups try the local LRU first, then the shared backend.
+    Shared-tier failures are treated as misses so reads fall back to the database.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: int,
+        negative_ttl: int,
+        local_max_items: int,
+        local_ttl: int
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = LRUCache(local_max_items, local_ttl) if local_max_items > 0 else None
+        self.stats = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "errors": 0
+        }
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value, NOT_FOUND for a cached 404, or None on a miss.
+        """
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                self.stats["local_hits"] += 1
+                return NOT_FOUND if value == _NOT_FOUND_MARKER else value
+
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ Cache read failed for {key}: {e}")
+            raw = None
+
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["shared_hits"] += 1
+        value = json.loads(raw)
+        if self.local is not None:
+            self.local.set(key, value)
+        return NOT_FOUND if value == _NOT_FOUND_MARKER else value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        ttl = self.ttl if ttl is None else ttl
+        if self.local is not None:
+            self.local.set(key, value, ttl)
+        try:
+            await self.backend.set(key, json.dumps(value, default=str), ttl)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ Cache write failed for {key}: {e}")
+
+    async def set_not_found(self, key: str) -> None:
+        """Cache a 404 for a short time so repeated misses skip the database."""
+        await self.set(key, _NOT_FOUND_MARKER, self.negative_ttl)
+
+    async def delete(self, *keys: str) -> None:
+        """Invalidate keys in both tiers."""
+        if self.local is not None:
+            self.local.delete(*keys)
+        try:
+            await self.backend.delete(*keys)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ Cache delete failed for {keys}: {e}")
+
+
+def create_cache_backend() -> CacheBackend:
+    """Build the shared cache tier selected by CACHE_BACKEND."""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    if settings.CACHE_BACKEND == "local":
+        return LocalCacheBackend()
+    if settings.CACHE_BACKEND == "none":
+        return NullCacheBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+# Global cache instance
+quiz_cache = QuizCache(
+    backend=create_cache_backend(),
+    ttl=settings.CACHE_TTL_SECONDS,
+    negative_ttl=settings.CACHE_NEGATIVE_TTL_SECONDS,
+    local_max_items=settings.CACHE_LOCAL_MAX_ITEMS,
+    local_ttl=settings.CACHE_LOCAL_TTL_SECONDS
+)
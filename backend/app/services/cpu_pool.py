@@ -0,0 +1,81 @@
+"""
+Process-pool offload for CPU-bound work.
+HTML parsing, text cleanup and entity extraction are pure Python and hold
+the GIL, so running them on the request thread slows every other request in
+the worker. With CPU_POOL_WORKERS > 0 they run in a separate process pool;
+only the raw HTML goes in and plain dicts / strings come back.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+import asyncio
+import multiprocessing
+
+from app.config import settings
+from app.concurrency import profiling_active, run_blocking
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Lazily create the process pool (None when CPU_POOL_WORKERS is 0).
+    Uses the "spawn" start method: forking a process that already runs an
+    event loop, DB pool and threads is unsafe.
+    """
+    global _executor
+    if _executor is None and settings.CPU_POOL_WORKERS > 0:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.CPU_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def run_cpu(func: Callable, *args: Any) -> Any:
+    """
+    Run a module-level CPU-bound function in the process pool.
+    Falls back to the threadpool when the pool is disabled, and runs
+    inline while the request is being profiled: the profiler only samples
+    the event-loop thread, so CPU work elsewhere wouldn't show up.
+    If a child process dies (e.g. OOM-killed), the broken pool is replaced
+    and the call retried once on the fresh pool.
+    """
+    if profiling_active.get():
+        return func(*args)
+
+    executor = get_executor()
+    if executor is None:
+        return await run_blocking(func, *args)
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        try:
+            return await loop.run_in_executor(executor, partial(func, *args))
+        except BrokenProcessPool:
+            print(f"⚠️ CPU pool broken, restarting it (attempt {attempt + 1})")
+            reset_executor(executor)
+            if attempt == 1:
+                raise
+            executor = get_executor()
+
+
+def reset_executor(broken: ProcessPoolExecutor) -> None:
+    """
+    Drop a broken pool so the next call starts a new one.
+    Concurrent callers may hit the same broken pool; only the first resets it.
+    """
+    global _executor
+    if _executor is broken:
+        _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_executor() -> None:
+    """Stop the process pool (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
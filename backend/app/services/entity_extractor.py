@@ -38,7 +38,9 @@ class EntityExtractor:
                            'State', 'City', 'Country', 'London', 'Paris', 'Berlin']
         
         # Simple categorization based on keywords
-        for phrase in set(capitalized_phrases[:50]):  # Limit to 50 unique phrases
+        # dict.fromkeys keeps first-seen order, so results don't depend on
+        # per-process string hashing (identical inline and in a process pool)
+        for phrase in dict.fromkeys(capitalized_phrases[:50]):  # Limit to 50 unique phrases
             phrase_lower = phrase.lower()
             
             # Skip common words
@@ -54,8 +56,8 @@ class EntityExtractor:
                 entities['people'].append(phrase)
         
         # Remove duplicates and limit results
-        entities['people'] = list(set(entities['people']))[:10]
-        entities['organizations'] = list(set(entities['organizations']))[:10]
-        entities['locations'] = list(set(entities['locations']))[:10]
+        entities['people'] = list(dict.fromkeys(entities['people']))[:10]
+        entities['organizations'] = list(dict.fromkeys(entities['organizations']))[:10]
+        entities['locations'] = list(dict.fromkeys(entities['locations']))[:10]
         
         return entities
@@ -5,10 +5,109 @@ Generates quiz questions and related topics from Wikipedia content.
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+from pydantic import ValidationError
 from app.config import settings
-from typing import Dict, List, Any
+from app.schemas.quiz import QuestionSchema
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
 import json
 import re
+import time
+
+
+# Output tokens spent on JSON framing and related topics, outside the questions
+OUTPUT_OVERHEAD_TOKENS = 80
+
+# Headroom on the per-question estimate so caps don't truncate the last question
+TOKEN_SAFETY_FACTOR = 1.3
+
+# Floors for the running estimates, so a few bad measurements can't shrink
+# every later generation's budget to nothing
+MIN_TOKENS_PER_QUESTION = 60.0
+MIN_FIRST_TOKEN_SECONDS = 0.1
+MIN_TOKENS_PER_SECOND = 10.0
+
+
+class LatencyModel:
+    """
+    Running estimates used to size a generation to a latency or token budget.
+    Starts from conservative defaults and is updated (EWMA) from every
+    streamed quiz generation in this worker.
+    """
+
+    def __init__(self):
+        self.tokens_per_question = 120.0  # Output tokens per generated question
+        self.first_token_seconds = 1.5  # Request + prompt processing time
+        self.tokens_per_second = 60.0  # Output decoding speed
+        self.samples = 0
+
+    def observe(
+        self,
+        num_questions: int,
+        output_tokens: int,
+        first_token_seconds: float,
+        total_seconds: float,
+        alpha: float = 0.2
+    ) -> None:
+        """Fold one measured generation into the running estimates."""
+        if num_questions <= 0 or output_tokens <= 0:
+            return
+
+        per_question = max(1.0, (output_tokens - OUTPUT_OVERHEAD_TOKENS) / num_questions)
+        decode_seconds = max(0.001, total_seconds - first_token_seconds)
+
+        self.tokens_per_question = max(
+            MIN_TOKENS_PER_QUESTION,
+            self.tokens_per_question + alpha * (per_question - self.tokens_per_question)
+        )
+        self.first_token_seconds = max(
+            MIN_FIRST_TOKEN_SECONDS,
+            self.first_token_seconds + alpha * (first_token_seconds - self.first_token_seconds)
+        )
+        self.tokens_per_second = max(
+            MIN_TOKENS_PER_SECOND,
+            self.tokens_per_second + alpha * (output_tokens / decode_seconds - self.tokens_per_second)
+        )
+        self.samples += 1
+
+    def plan(
+        self,
+        content_length: int,
+        num_questions: Optional[int] = None,
+        max_latency_ms: Optional[int] = None,
+        max_output_tokens: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Decide question count, output-token cap and content size for one request.
+        Without a requested count, short articles get fewer questions.
+        A latency budget is converted into an output-token budget using the
+        measured first-token time and decoding speed.
+        """
+        if num_questions is None:
+            num_questions = max(3, min(7, content_length // 1500))
+
+        token_budget = max_output_tokens or 8192
+        if max_latency_ms is not None:
+            decode_seconds = max_latency_ms / 1000 - self.first_token_seconds
+            token_budget = min(token_budget, int(decode_seconds * self.tokens_per_second))
+
+        per_question = self.tokens_per_question * TOKEN_SAFETY_FACTOR
+        affordable = int((token_budget - OUTPUT_OVERHEAD_TOKENS) // per_question)
+        num_questions = max(1, min(num_questions, affordable))
+
+        output_cap = int(OUTPUT_OVERHEAD_TOKENS + per_question * num_questions)
+        output_cap = max(256, min(output_cap, token_budget))
+
+        return {
+            "num_questions": num_questions,
+            "max_output_tokens": output_cap,
+            # ~2000 characters of article per question, within the 15000 cap
+            "content_chars": min(15000, max(4000, 2000 * num_questions))
+        }
+
+
+# Shared by every generator in this worker
+latency_model = LatencyModel()
 
 
 class QuizGenerator:
@@ -16,7 +115,7 @@ class QuizGenerator:
     Quiz generation service using Google Gemini via LangChain.
     """
 
-    def __init__(self):
+    def __init__(self, max_output_tokens: int = 2048):
         """
         Initialize Gemini model.
         """
@@ -24,8 +123,11 @@ class QuizGenerator:
             model="gemini-1.5-flash",  # ✅ correct model for langchain-google-genai==0.0.9
             google_api_key=settings.GEMINI_API_KEY,
             temperature=0.7,
-            max_output_tokens=2048,
+            max_output_tokens=max_output_tokens,
         )
+        # Running token count and LLM wall time for every call made by this instance
+        self.tokens_used = 0
+        self.llm_seconds = 0.0
 
     # ================= PROMPTS ================= #
 
@@ -88,8 +190,273 @@ Return ONLY a valid JSON array:
             template=template.strip(),
         )
 
+    def create_topic_choice_prompt(self) -> PromptTemplate:
+        template = """
+Pick the {count} topics most closely related to the Wikipedia article below.
+
+ARTICLE TITLE:
+{title}
+
+ARTICLE SUMMARY:
+{summary}
+
+CANDIDATE TOPICS:
+{candidates}
+
+Use ONLY topics from the candidate list, spelled exactly as given.
+Return ONLY a valid JSON array of {count} topic strings, most related first.
+"""
+        return PromptTemplate(
+            input_variables=["title", "summary", "candidates", "count"],
+            template=template.strip(),
+        )
+
+    def create_combined_prompt(self) -> PromptTemplate:
+        template = """
+You are an expert educator creating a quiz based on a Wikipedia article.
+
+ARTICLE TITLE:
+{title}
+
+ARTICLE CONTENT:
+{content}
+
+INSTRUCTIONS:
+1. Suggest 5 related Wikipedia topics.
+2. Generate EXACTLY {num_questions} multiple-choice questions.
+3. Each question must include:
+   - question
+   - 4 options
+   - correct answer
+   - difficulty (easy / medium / hard)
+   - explanation
+
+RULES:
+- Use ONLY the given article content for questions
+- Do NOT invent facts
+- Mix difficulty levels
+- Return ONE VALID JSON OBJECT ONLY
+
+OUTPUT FORMAT:
+{{
+  "related_topics": ["Topic 1", "Topic 2", "Topic 3", "Topic 4", "Topic 5"],
+  "questions": [
+    {{
+      "question": "...",
+      "options": ["A", "B", "C", "D"],
+      "answer": "B",
+      "difficulty": "medium",
+      "explanation": "..."
+    }}
+  ]
+}}
+"""
+        return PromptTemplate(
+            input_variables=["title", "content", "num_questions"],
+            template=template.strip(),
+        )
+
+    def create_targeted_prompt(self) -> PromptTemplate:
+        template = """
+You are an expert educator adding questions to an existing quiz on a Wikipedia article.
+
+ARTICLE TITLE:
+{title}
+
+ARTICLE CONTENT:
+{content}
+
+EXISTING QUESTIONS (do NOT repeat or paraphrase these):
+{existing_questions}
+
+INSTRUCTIONS:
+1. Generate EXACTLY {num_questions} NEW multiple-choice questions.
+2. {difficulty_instruction}
+3. Each question must include question, 4 options, correct answer, difficulty and explanation.
+
+RULES:
+- Use ONLY the given article content
+- Do NOT invent facts
+- Return VALID JSON ONLY
+
+OUTPUT FORMAT:
+[
+  {{
+    "question": "...",
+    "options": ["A", "B", "C", "D"],
+    "answer": "B",
+    "difficulty": "medium",
+    "explanation": "..."
+  }}
+]
+"""
+        return PromptTemplate(
+            input_variables=[
+                "title",
+                "content",
+                "existing_questions",
+                "num_questions",
+                "difficulty_instruction",
+            ],
+            template=template.strip(),
+        )
+
     # ================= HELPERS ================= #
 
+    async def _invoke(self, prompt: PromptTemplate, inputs: Dict[str, Any]) -> Any:
+        """
+        Run a prompt through the LLM and record the tokens it used.
+        Falls back to a ~4 characters per token estimate when the
+        provider doesn't report usage.
+        """
+        chain = prompt | self.llm  # ✅ modern LangChain style
+        start = time.perf_counter()
+        response = await chain.ainvoke(inputs)
+        self.llm_seconds += time.perf_counter() - start
+
+        self._record_usage(
+            getattr(response, "usage_metadata", None),
+            prompt,
+            inputs,
+            response.content or ""
+        )
+        return response
+
+    async def _stream_questions(
+        self,
+        prompt: PromptTemplate,
+        inputs: Dict[str, Any],
+        num_questions: int,
+        questions_key: Optional[str] = None,
+        required_key: Optional[str] = None
+    ) -> Tuple[List[Dict], str]:
+        """
+        Stream a quiz response and stop as soon as enough valid questions
+        have been parsed, so the model isn't paid to write extras.
+
+        `questions_key` names the array holding the questions when the
+        response is a JSON object; otherwise the response is a JSON array.
+        If `required_key` is given, streaming only stops early once that
+        key's array has been received in full, so it isn't cut off.
+        Returns the validated questions and the raw text received.
+        """
+        chain = prompt | self.llm
+        text = ""
+        aggregate = None
+        questions: List[Dict] = []
+        scan_from: Optional[int] = None
+        stopped_early = False
+
+        start = time.perf_counter()
+        first_token_at = None
+        stream = chain.astream(inputs)
+        try:
+            async for chunk in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                # Chunk usage is additive (per-chunk deltas), so sum the chunks
+                aggregate = chunk if aggregate is None else aggregate + chunk
+                text += chunk.content or ""
+
+                if scan_from is None:
+                    scan_from = self._find_questions_start(text, questions_key)
+                    if scan_from is None:
+                        continue
+
+                objects, scan_from = self._extract_json_objects(text, scan_from)
+                questions.extend(self.validate_questions(objects))
+                if len(questions) >= num_questions and (
+                    required_key is None or self._find_array(text, required_key) is not None
+                ):
+                    stopped_early = True
+                    break
+        finally:
+            await stream.aclose()
+
+        total_seconds = time.perf_counter() - start
+        self.llm_seconds += total_seconds
+        output_tokens = self._record_usage(
+            getattr(aggregate, "usage_metadata", None), prompt, inputs, text
+        )
+
+        # Incremental parsing can miss questions in oddly formatted output
+        if not stopped_early and len(questions) < num_questions:
+            try:
+                data = self.parse_json_response(text)
+                if questions_key and isinstance(data, dict):
+                    data = data.get(questions_key)
+                parsed = self.validate_questions(data)
+                if len(parsed) > len(questions):
+                    questions = parsed
+            except ValueError:
+                pass
+
+        latency_model.observe(
+            num_questions=len(questions),
+            output_tokens=output_tokens,
+            first_token_seconds=(first_token_at or start) - start,
+            total_seconds=total_seconds
+        )
+        return questions[:num_questions], text
+
+    def _record_usage(
+        self,
+        usage: Optional[Dict[str, Any]],
+        prompt: PromptTemplate,
+        inputs: Dict[str, Any],
+        output_text: str
+    ) -> int:
+        """
+        Add one call's tokens to the running total and return its output tokens.
+        Falls back to a ~4 characters per token estimate when the provider
+        doesn't report usage (e.g. a stream stopped early).
+        """
+        usage = usage or {}
+        output_tokens = usage.get("output_tokens") or len(output_text) // 4
+        if usage.get("total_tokens"):
+            self.tokens_used += usage["total_tokens"]
+        else:
+            prompt_chars = len(prompt.format(**inputs))
+            self.tokens_used += prompt_chars // 4 + output_tokens
+        return output_tokens
+
+    def _find_array(self, text: str, key: str) -> Optional[str]:
+        """
+        Raw text of a complete JSON array of strings under `key`, if received.
+        """
+        match = re.search(r'"' + re.escape(key) + r'"\s*:\s*(\[.*?\])', text, re.DOTALL)
+        return match.group(1) if match else None
+
+    def _find_questions_start(self, text: str, questions_key: Optional[str]) -> Optional[int]:
+        """
+        Position just inside the question array, or None if not received yet.
+        """
+        if questions_key:
+            match = re.search(r'"' + re.escape(questions_key) + r'"\s*:\s*\[', text)
+            return match.end() if match else None
+        index = text.find("[")
+        return index + 1 if index != -1 else None
+
+    def _extract_json_objects(self, text: str, start: int) -> Tuple[List[Any], int]:
+        """
+        Decode every complete JSON object from `start` onwards.
+        Returns the objects and the position to resume from once more text arrives.
+        """
+        decoder = json.JSONDecoder()
+        objects = []
+        pos = start
+        while True:
+            brace = text.find("{", pos)
+            if brace == -1:
+                break
+            try:
+                obj, end = decoder.raw_decode(text, brace)
+            except json.JSONDecodeError:
+                break  # Object not complete yet
+            objects.append(obj)
+            pos = end
+        return objects, pos
+
     def parse_json_response(self, response: str) -> Any:
         """
         Safely parse JSON returned by the LLM.
@@ -97,14 +464,50 @@ Return ONLY a valid JSON array:
         try:
             return json.loads(response)
         except json.JSONDecodeError:
-            match = re.search(r"\[.*\]", response, re.DOTALL)
+            # Strip prose / code fences around the first array or object
+            match = re.search(r"[\[{].*[\]}]", response, re.DOTALL)
             if match:
-                return json.loads(match.group())
+                try:
+                    return json.loads(match.group())
+                except json.JSONDecodeError:
+                    pass
             raise ValueError("Invalid JSON returned by LLM")
 
+    def validate_questions(self, questions: Any) -> List[Dict]:
+        """
+        Keep only well-formed questions and normalize their difficulty.
+        Each question is checked against QuestionSchema.
+        """
+        if not isinstance(questions, list):
+            return []
+
+        validated_questions = []
+        for q in questions:
+            if isinstance(q, dict) and all(
+                k in q
+                for k in ["question", "options", "answer", "difficulty", "explanation"]
+            ):
+                if q["difficulty"] not in ["easy", "medium", "hard"]:
+                    q["difficulty"] = "medium"
+                try:
+                    QuestionSchema(**q)
+                except ValidationError:
+                    continue
+                validated_questions.append(q)
+
+        return validated_questions
+
+    def validate_topics(self, topics: Any) -> List[str]:
+        """
+        Keep up to 5 non-empty topic strings.
+        """
+        if not isinstance(topics, list):
+            return []
+        return [t.strip() for t in topics if isinstance(t, str) and t.strip()][:5]
+
     # ================= MAIN METHODS ================= #
 
-    def generate_quiz(
+    async def generate_quiz(
         self, title: str, content: str, num_questions: int = 7
     ) -> List[Dict]:
 
@@ -113,38 +516,184 @@ Return ONLY a valid JSON array:
             content = content[:15000]
 
         prompt = self.create_quiz_prompt()
-        chain = prompt | self.llm  # ✅ modern LangChain style
+        questions, text = await self._stream_questions(
+            prompt,
+            {
+                "title": title,
+                "content": content,
+                "num_questions": num_questions,
+            },
+            num_questions
+        )
+
+        if not text:
+            raise Exception("LLM returned empty response")
+        if not questions:
+            raise ValueError("LLM response contained no valid questions")
 
-        response = chain.invoke(
+        return questions
+
+    async def generate_quiz_and_topics(
+        self, title: str, content: str, summary: str, num_questions: int = 7
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        Generate questions and related topics for a new quiz.
+
+        In "combined" mode a single prompt returns both, saving a full LLM
+        round trip. If that response can't be parsed (or LLM_GENERATION_MODE
+        is "parallel"), the two separate calls are issued concurrently.
+        """
+        if settings.LLM_GENERATION_MODE == "combined":
+            try:
+                questions, topics = await self._generate_combined(title, content, num_questions)
+                if questions:
+                    if not topics:
+                        topics = await self.generate_related_topics(title=title, summary=summary)
+                    return questions, topics
+            except ValueError as e:
+                print(f"⚠️ Combined generation unusable, falling back to parallel calls: {e}")
+
+        questions, topics = await asyncio.gather(
+            self.generate_quiz(title=title, content=content, num_questions=num_questions),
+            self.generate_related_topics(title=title, summary=summary),
+        )
+        return questions, topics
+
+    async def _generate_combined(
+        self, title: str, content: str, num_questions: int
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        One LLM call returning {"related_topics": [...], "questions": [...]}.
+        """
+
+        # Prevent token overflow
+        if len(content) > 15000:
+            content = content[:15000]
+
+        prompt = self.create_combined_prompt()
+        questions, text = await self._stream_questions(
+            prompt,
             {
                 "title": title,
                 "content": content,
                 "num_questions": num_questions,
+            },
+            num_questions,
+            questions_key="questions",
+            required_key="related_topics"
+        )
+
+        if not text:
+            raise ValueError("LLM returned empty response")
+        if not questions:
+            raise ValueError("Combined response contained no valid questions")
+
+        # Streaming never stops early before the topics array is complete
+        topics = []
+        raw_topics = self._find_array(text, "related_topics")
+        if raw_topics:
+            try:
+                topics = self.validate_topics(json.loads(raw_topics))
+            except json.JSONDecodeError:
+                pass
+
+        return questions, topics
+
+    async def generate_additional_questions(
+        self,
+        title: str,
+        content: str,
+        existing_questions: List[str],
+        num_questions: int,
+        difficulties: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Generate a few new questions for an existing quiz.
+        Sends a much smaller prompt than a full generation: trimmed content
+        plus the current question texts so the model avoids duplicates.
+        """
+
+        # Targeted prompts only need a slice of the article
+        if len(content) > 6000:
+            content = content[:6000]
+
+        if difficulties:
+            if len(set(difficulties)) == 1:
+                difficulty_instruction = f"All questions must be '{difficulties[0]}' difficulty."
+            else:
+                difficulty_instruction = (
+                    "Use these difficulties, in order: " + ", ".join(difficulties) + "."
+                )
+        else:
+            difficulty_instruction = "Mix difficulty levels (easy / medium / hard)."
+
+        existing = "\n".join(f"- {q}" for q in existing_questions) or "(none)"
+
+        prompt = self.create_targeted_prompt()
+        response = await self._invoke(
+            prompt,
+            {
+                "title": title,
+                "content": content,
+                "existing_questions": existing,
+                "num_questions": num_questions,
+                "difficulty_instruction": difficulty_instruction,
             }
         )
 
         if not response.content:
             raise Exception("LLM returned empty response")
 
-        questions = self.parse_json_response(response.content)
+        questions = self.validate_questions(self.parse_json_response(response.content))
 
-        validated_questions = []
+        # Drop anything that slipped through as an exact duplicate
+        seen = {q.strip().lower() for q in existing_questions}
+        fresh = []
         for q in questions:
-            if all(
-                k in q
-                for k in ["question", "options", "answer", "difficulty", "explanation"]
-            ):
-                if q["difficulty"] not in ["easy", "medium", "hard"]:
-                    q["difficulty"] = "medium"
-                validated_questions.append(q)
+            key = q["question"].strip().lower()
+            if key not in seen:
+                seen.add(key)
+                fresh.append(q)
 
-        return validated_questions[:num_questions]
+        # Honour explicit difficulty requests even if the model drifted
+        if difficulties:
+            for q, difficulty in zip(fresh, difficulties):
+                q["difficulty"] = difficulty
 
-    def generate_related_topics(self, title: str, summary: str) -> List[str]:
-        prompt = self.create_topics_prompt()
-        chain = prompt | self.llm  # ✅ modern style
+        return fresh[:num_questions]
 
-        response = chain.invoke(
+    async def choose_related_topics(
+        self, title: str, summary: str, candidates: List[str], count: int
+    ) -> List[str]:
+        """
+        Choose `count` topics from a fixed candidate list.
+        Used only as a tiebreaker for link-graph ranking, so the prompt is
+        tiny: the summary plus a short list of candidate titles.
+        """
+        prompt = self.create_topic_choice_prompt()
+        response = await self._invoke(
+            prompt,
+            {
+                "title": title,
+                "summary": summary[:1500],
+                "candidates": "\n".join(f"- {c}" for c in candidates),
+                "count": count,
+            }
+        )
+
+        if not response.content:
+            return []
+
+        allowed = set(candidates)
+        chosen = self.parse_json_response(response.content)
+        if not isinstance(chosen, list):
+            return []
+        return [t for t in chosen if isinstance(t, str) and t in allowed][:count]
+
+    async def generate_related_topics(self, title: str, summary: str) -> List[str]:
+        prompt = self.create_topics_prompt()
+        response = await self._invoke(
+            prompt,
             {
                 "title": title,
                 "summary": summary,
@@ -155,4 +704,4 @@ Return ONLY a valid JSON array:
             return []
 
         topics = self.parse_json_response(response.content)
-        return topics[:5] if isinstance(topics, list) else []
+        return self.validate_topics(topics)
@@ -0,0 +1,248 @@
+"""
+Background quiz prefetcher.
+Speculatively generates quizzes for related topics after a quiz is created,
+and warms the cache from explicit URL lists. All work runs at low priority:
+a job only starts while no live generate request is in progress, takes a
+generation slot at background priority, and waits until it fits within an
+hourly generation and token budget.
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Iterable, List, Optional, Set, Tuple
+import asyncio
+import itertools
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database.connection import SessionLocal
+from app.services.admission import admission_controller, BACKGROUND_PRIORITY
+from app.services.quiz_builder import create_quiz, find_existing_quiz
+from app.services.scraper import WIKIPEDIA_ARTICLE_PREFIX, normalize_article_url
+
+
+# Lower number = served first
+WARM_PRIORITY = 1
+SPECULATIVE_PRIORITY = 2
+
+def topic_to_url(topic: str) -> str:
+    """
+    Resolve a related-topic title to its English Wikipedia article URL.
+    Wikipedia redirects handle capitalisation and alias differences.
+    """
+    return normalize_article_url(WIKIPEDIA_ARTICLE_PREFIX + topic.strip())
+
+
+def read_url_file(path: str) -> List[str]:
+    """
+    Read Wikipedia URLs from a text file such as sample_data/test_urls.txt.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(WIKIPEDIA_ARTICLE_PREFIX):
+                urls.append(line)
+    return urls
+
+
+class QuizPrefetcher:
+    """
+    Single background worker draining a priority queue of URLs to pre-generate.
+    """
+
+    def __init__(
+        self,
+        speculative_enabled: bool,
+        max_depth: int,
+        max_per_hour: int,
+        token_cap_per_hour: int,
+        queue_size: int
+    ):
+        self.speculative_enabled = speculative_enabled
+        self.max_depth = max_depth
+        self.max_per_hour = max_per_hour
+        self.token_cap_per_hour = token_cap_per_hour
+        self.queue: "asyncio.PriorityQueue[Tuple[int, int, str, int]]" = asyncio.PriorityQueue(
+            maxsize=queue_size
+        )
+        self._counter = itertools.count()  # Keeps FIFO order within a priority
+        self._queued: Set[str] = set()
+        self._history: Deque[Tuple[float, int]] = deque()  # (finished_at, tokens)
+        self._live_requests = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "queued": 0,
+            "generated": 0,
+            "skipped_existing": 0,
+            "deferred_budget": 0,
+            "failed": 0
+        }
+
+    # ================= LIFECYCLE ================= #
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._worker())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ================= LIVE TRAFFIC ================= #
+
+    @asynccontextmanager
+    async def live_request(self):
+        """
+        Wrap live (user-facing) generations so prefetch work waits for them.
+        """
+        self._live_requests += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._live_requests -= 1
+            if self._live_requests == 0:
+                self._idle.set()
+
+    # ================= SCHEDULING ================= #
+
+    def enqueue(self, url: str, depth: int, priority: int = WARM_PRIORITY) -> bool:
+        """
+        Queue a URL for background generation.
+        Returns False if it is already queued or the queue is full.
+        """
+        if url in self._queued:
+            return False
+        try:
+            self.queue.put_nowait((priority, next(self._counter), url, depth))
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(url)
+        self.stats["queued"] += 1
+        return True
+
+    def schedule_related(self, quiz: Any, depth: int = 0) -> int:
+        """
+        Queue the related topics of a freshly created quiz.
+        `quiz` may be a QuizResponse or its cached dict form.
+        """
+        if not self.speculative_enabled or depth >= self.max_depth:
+            return 0
+
+        if isinstance(quiz, dict):
+            links = quiz.get("related_topic_links", [])
+        else:
+            links = [link.model_dump() for link in quiz.related_topic_links]
+
+        scheduled = 0
+        for link in links:
+            # Link-graph topics carry real URLs; LLM topics are resolved by title
+            url = link.get("url") or topic_to_url(link["topic"])
+            if self.enqueue(url, depth + 1, SPECULATIVE_PRIORITY):
+                scheduled += 1
+        return scheduled
+
+    def warm(self, urls: Iterable[str]) -> int:
+        """
+        Queue explicit URLs without expanding their related topics.
+        """
+        return sum(1 for url in urls if self.enqueue(url, self.max_depth, WARM_PRIORITY))
+
+    # ================= BUDGET ================= #
+
+    def _budget_delay(self) -> float:
+        """
+        Seconds until another job fits in the hourly budget (0 if it fits now).
+        """
+        now = time.monotonic()
+        while self._history and self._history[0][0] < now - 3600:
+            self._history.popleft()
+
+        if (
+            len(self._history) < self.max_per_hour
+            and sum(tokens for _, tokens in self._history) < self.token_cap_per_hour
+        ):
+            return 0.0
+        # Re-check once the oldest job leaves the window
+        return max(1.0, self._history[0][0] + 3600 - now)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "pending": self.queue.qsize(),
+            "generated_last_hour": len(self._history),
+            "tokens_last_hour": sum(tokens for _, tokens in self._history)
+        }
+
+    # ================= WORKER ================= #
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _, url, depth = await self.queue.get()
+            try:
+                # Over budget: defer the job (and the queue behind it) instead of dropping it
+                delay = self._budget_delay()
+                if delay > 0:
+                    self.stats["deferred_budget"] += 1
+                while delay > 0:
+                    await asyncio.sleep(delay)
+                    delay = self._budget_delay()
+
+                # Yield to live user requests before starting any work
+                await self._idle.wait()
+
+                await self._prefetch(url, depth)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"⚠️ Prefetch failed for {url}: {e}")
+            finally:
+                self._queued.discard(url)
+                self.queue.task_done()
+
+    async def _prefetch(self, url: str, depth: int) -> None:
+        async with SessionLocal() as db:
+            if await find_existing_quiz(url, db):
+                self.stats["skipped_existing"] += 1
+                return
+
+            # Release the connection while waiting for a generation slot
+            await db.commit()
+            try:
+                async with admission_controller.admit(BACKGROUND_PRIORITY):
+                    response = await create_quiz(url, db)
+            except IntegrityError:
+                # Another worker generated the same URL first
+                await db.rollback()
+                self.stats["skipped_existing"] += 1
+                return
+            except Exception:
+                # Failed attempts still count against the hourly generation budget
+                await db.rollback()
+                self._history.append((time.monotonic(), 0))
+                raise
+
+        self._history.append((time.monotonic(), response.llm_tokens_used or 0))
+        self.stats["generated"] += 1
+        self.schedule_related(response, depth)
+
+
+# Global prefetcher instance
+quiz_prefetcher = QuizPrefetcher(
+    speculative_enabled=settings.PREFETCH_ENABLED,
+    max_depth=settings.PREFETCH_MAX_DEPTH,
+    max_per_hour=settings.PREFETCH_MAX_PER_HOUR,
+    token_cap_per_hour=settings.PREFETCH_TOKEN_CAP,
+    queue_size=settings.PREFETCH_QUEUE_SIZE
+)
@@ -0,0 +1,236 @@
+"""
+Quiz building service.
+Runs the full scrape -> extract -> LLM -> store pipeline and formats stored
+quizzes for the API. Shared by the routes and the background prefetcher.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from typing import Any, List, Optional
+from urllib.parse import unquote
+import time
+from app.config import settings
+from app.models.database import Quiz, QuizQuestion, RelatedTopic, ArticleLink
+from app.schemas.quiz import QuizResponse, QuestionSchema, KeyEntitiesSchema, RelatedTopicSchema
+from app.services.scraper import WikipediaScraper, parse_article, normalize_article_url
+from app.services.llm_service import QuizGenerator, latency_model
+from app.services.cpu_pool import run_cpu
+from app.services.related_topics import RelatedTopicRanker
+from app.services.cache import quiz_cache, quiz_key, quiz_url_key, HISTORY_KEY, NOT_FOUND
+from app.concurrency import run_blocking
+
+
+async def find_existing_quiz(url: str, db: AsyncSession) -> Optional[Any]:
+    """
+    Look up an already generated quiz by URL.
+    Checks the shared cache before the database.
+    Returns a QuizResponse (or its cached dict form), or None if not found.
+    """
+    url = normalize_article_url(url)
+    cached_id = await quiz_cache.get(quiz_url_key(url))
+    if cached_id is not None and cached_id is not NOT_FOUND:
+        cached = await quiz_cache.get(quiz_key(cached_id))
+        if cached is not None and cached is not NOT_FOUND:
+            return cached
+
+    # Quizzes stored before URLs were normalized may hold the decoded form
+    result = await db.execute(
+        select(Quiz).options(defer(Quiz.raw_html)).where(Quiz.url.in_({url, unquote(url)}))
+    )
+    existing_quiz = result.scalars().first()
+    if existing_quiz:
+        response = await format_quiz_response(existing_quiz, db)
+        await cache_quiz_response(response)
+        return response
+
+    return None
+
+
+async def create_quiz(
+    url: str,
+    db: AsyncSession,
+    num_questions: Optional[int] = None,
+    max_latency_ms: Optional[int] = None,
+    max_output_tokens: Optional[int] = None
+) -> QuizResponse:
+    """
+    Scrape a Wikipedia article, generate its quiz and store it.
+    Question count, output-token cap and content size are planned from the
+    article length and the optional budgets (see LatencyModel.plan).
+    The caller is responsible for rolling back on failure.
+    """
+    start = time.perf_counter()
+    url = normalize_article_url(url)
+
+    # Release the pooled connection while scraping and waiting on the LLM
+    await db.commit()
+
+    # Step 1: Fetch Wikipedia HTML (I/O, threadpool)
+    scraper = WikipediaScraper(url)
+    scraper.validate_url()
+    raw_html = await run_blocking(scraper.fetch_html)
+
+    # Step 2: Parse article, extract entities and links (CPU, process pool)
+    scraped_data = await run_cpu(parse_article, url, raw_html)
+    entities = scraped_data['entities']
+
+    # Step 3: Size the generation to the article and the caller's budget
+    # (scraping time already spent counts against the latency budget)
+    if max_latency_ms is not None:
+        max_latency_ms -= int(1000 * (time.perf_counter() - start))
+    plan = latency_model.plan(
+        content_length=len(scraped_data['full_text']),
+        num_questions=num_questions,
+        max_latency_ms=max_latency_ms,
+        max_output_tokens=max_output_tokens
+    )
+
+    # Step 4: Generate quiz using LLM
+    # With the link graph available only questions are needed (one call);
+    # otherwise questions and related topics come from the LLM
+    # (one combined call, or two concurrent calls as a fallback)
+    quiz_generator = QuizGenerator(max_output_tokens=plan['max_output_tokens'])
+    content = scraped_data['full_text'][:plan['content_chars']]
+    use_link_graph = settings.RELATED_TOPICS_SOURCE == "links" and bool(scraped_data['links'])
+    if use_link_graph:
+        questions = await quiz_generator.generate_quiz(
+            title=scraped_data['title'],
+            content=content,
+            num_questions=plan['num_questions']
+        )
+        related_topics = []
+    else:
+        questions, topic_titles = await quiz_generator.generate_quiz_and_topics(
+            title=scraped_data['title'],
+            content=content,
+            summary=scraped_data['summary'],
+            num_questions=plan['num_questions']
+        )
+        related_topics = [{'topic': topic, 'url': None} for topic in topic_titles]
+
+    # Never store (and cache under the URL) a quiz without questions
+    if not questions:
+        raise ValueError("Could not generate any valid questions for this article")
+
+    # Step 5: Store in database
+    quiz = Quiz(
+        url=url,
+        title=scraped_data['title'],
+        summary=scraped_data['summary'],
+        key_entities=entities,
+        sections=scraped_data['sections'],
+        raw_html=raw_html  # BONUS: Store raw HTML
+    )
+    db.add(quiz)
+    await db.flush()  # Get quiz.id before adding questions
+
+    # Add link graph edges
+    for link in scraped_data['links']:
+        db.add(ArticleLink(
+            quiz_id=quiz.id,
+            target_title=link['title'],
+            target_url=link['url'],
+            lead_count=link['lead_count'],
+            total_count=link['total_count']
+        ))
+
+    # Add questions
+    for q in questions:
+        question = QuizQuestion(
+            quiz_id=quiz.id,
+            question=q['question'],
+            options=q['options'],
+            answer=q['answer'],
+            difficulty=q['difficulty'],
+            explanation=q.get('explanation', ''),
+            section_reference=q.get('section_reference')
+        )
+        db.add(question)
+
+    # Add related topics (ranked from the link graph; LLM only breaks ties)
+    if use_link_graph:
+        related_topics = await RelatedTopicRanker(db).rank(
+            quiz_id=quiz.id,
+            quiz_url=url,
+            links=scraped_data['links'],
+            tiebreaker=quiz_generator if settings.RELATED_TOPICS_LLM_TIEBREAK else None,
+            title=scraped_data['title'],
+            summary=scraped_data['summary']
+        )
+    for topic in related_topics:
+        related = RelatedTopic(quiz_id=quiz.id, topic=topic['topic'][:200], url=topic['url'])
+        db.add(related)
+
+    quiz.llm_tokens_used = quiz_generator.tokens_used
+    quiz.generation_ms = int(1000 * (time.perf_counter() - start))
+
+    await db.commit()
+    await db.refresh(quiz)
+
+    response = await format_quiz_response(quiz, db)
+    await cache_quiz_response(response)
+    await quiz_cache.delete(HISTORY_KEY)
+    return response
+
+
+async def cache_quiz_response(response: QuizResponse) -> None:
+    """
+    Store a formatted quiz in the cache under both its ID and its URL.
+    Also overwrites any cached 404 for that ID.
+    """
+    await quiz_cache.set(quiz_key(response.id), response.model_dump(mode="json"))
+    await quiz_cache.set(quiz_url_key(normalize_article_url(response.url)), response.id)
+
+
+async def get_quiz_questions(quiz_id: int, db: AsyncSession) -> List[QuizQuestion]:
+    """
+    Load a quiz's questions in creation order.
+    """
+    result = await db.execute(
+        select(QuizQuestion)
+        .where(QuizQuestion.quiz_id == quiz_id)
+        .order_by(QuizQuestion.id)
+    )
+    return list(result.scalars().all())
+
+
+async def format_quiz_response(quiz: Quiz, db: AsyncSession) -> QuizResponse:
+    """
+    Helper function to format quiz database model into response schema.
+    """
+    # Get questions
+    questions = await get_quiz_questions(quiz.id, db)
+    question_list = [
+        QuestionSchema(
+            id=q.id,
+            question=q.question,
+            options=q.options,
+            answer=q.answer,
+            difficulty=q.difficulty,
+            explanation=q.explanation,
+            section_reference=q.section_reference
+        )
+        for q in questions
+    ]
+
+    # Get related topics
+    topics = (await db.execute(
+        select(RelatedTopic.topic, RelatedTopic.url)
+        .where(RelatedTopic.quiz_id == quiz.id)
+        .order_by(RelatedTopic.id)
+    )).all()
+
+    return QuizResponse(
+        id=quiz.id,
+        url=quiz.url,
+        title=quiz.title,
+        summary=quiz.summary,
+        key_entities=KeyEntitiesSchema(**quiz.key_entities) if quiz.key_entities else None,
+        sections=quiz.sections or [],
+        quiz=question_list,
+        related_topics=[topic for topic, _ in topics],
+        related_topic_links=[RelatedTopicSchema(topic=topic, url=url) for topic, url in topics],
+        llm_tokens_used=quiz.llm_tokens_used,
+        generation_ms=quiz.generation_ms,
+        created_at=quiz.created_at
+    )
@@ -0,0 +1,134 @@
+"""
+Related-topic ranking from the article link graph.
+Scores the article's own internal links using signals already in the
+database, so related topics need no LLM call and always resolve to real
+Wikipedia URLs:
+- how often the article links the target, especially in the lead
+- co-citation: how many other stored quizzes also link the target
+- whether the target already has a quiz (clicking it is a cache hit)
+- stored quizzes whose articles link back to this one
+"""
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+import math
+
+from app.models.database import ArticleLink, Quiz
+from app.services.llm_service import QuizGenerator
+from app.services.scraper import normalize_article_url
+
+
+# Score weights
+LEAD_WEIGHT = 3.0
+FREQUENCY_WEIGHT = 1.0
+COCITATION_WEIGHT = 2.0
+QUIZZED_BONUS = 4.0
+BACKLINK_BONUS = 3.0
+
+
+class RelatedTopicRanker:
+    """
+    Ranks candidate related topics for one quiz.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def rank(
+        self,
+        quiz_id: int,
+        quiz_url: str,
+        links: List[Dict],
+        limit: int = 5,
+        tiebreaker: Optional[QuizGenerator] = None,
+        title: str = "",
+        summary: str = ""
+    ) -> List[Dict]:
+        """
+        Return up to `limit` topics as {topic, url, score}, best first.
+        `links` are this article's extracted links (see WikipediaScraper.extract_links);
+        their URLs and `quiz_url` are normalized (see normalize_article_url).
+        If `tiebreaker` is given, the LLM only orders candidates tied at the cut-off.
+        """
+        candidates: Dict[str, Dict] = {}
+        for link in links:
+            candidates[link['url']] = {
+                'topic': link['title'],
+                'url': link['url'],
+                'score': (
+                    LEAD_WEIGHT * min(link['lead_count'], 3)
+                    + FREQUENCY_WEIGHT * math.log1p(link['total_count'])
+                )
+            }
+
+        urls = list(candidates)
+        if urls:
+            # Co-citation: other stored quizzes linking the same targets
+            cocited = await self.db.execute(
+                select(ArticleLink.target_url, func.count(func.distinct(ArticleLink.quiz_id)))
+                .where(ArticleLink.target_url.in_(urls), ArticleLink.quiz_id != quiz_id)
+                .group_by(ArticleLink.target_url)
+            )
+            for url, count in cocited:
+                candidates[url]['score'] += COCITATION_WEIGHT * math.log1p(count)
+
+            # Targets that already have a quiz (older rows may store the decoded URL)
+            quizzed = await self.db.execute(
+                select(Quiz.url).where(Quiz.url.in_(urls + [unquote(url) for url in urls]))
+            )
+            for url in {normalize_article_url(url) for (url,) in quizzed}:
+                if url in candidates:
+                    candidates[url]['score'] += QUIZZED_BONUS
+
+        # Stored quizzes whose articles link to this one
+        backlinks = await self.db.execute(
+            select(Quiz.title, Quiz.url)
+            .join(ArticleLink, ArticleLink.quiz_id == Quiz.id)
+            .where(ArticleLink.target_url == quiz_url, Quiz.id != quiz_id)
+        )
+        for backlink_title, url in backlinks:
+            url = normalize_article_url(url)
+            if url == quiz_url:
+                continue
+            candidate = candidates.setdefault(url, {'topic': backlink_title, 'url': url, 'score': 0.0})
+            candidate['score'] += BACKLINK_BONUS
+
+        ranked = sorted(candidates.values(), key=lambda c: c['score'], reverse=True)
+        if tiebreaker is not None and len(ranked) > limit:
+            ranked = await self._break_tie(ranked, limit, tiebreaker, title, summary)
+
+        return [{**c, 'score': round(c['score'], 2)} for c in ranked[:limit]]
+
+    async def _break_tie(
+        self,
+        ranked: List[Dict],
+        limit: int,
+        tiebreaker: QuizGenerator,
+        title: str,
+        summary: str
+    ) -> List[Dict]:
+        """
+        Let the LLM order only the candidates tied with the last kept one.
+        """
+        cutoff = ranked[limit - 1]['score']
+        above = [c for c in ranked if c['score'] > cutoff]
+        tied = [c for c in ranked if c['score'] == cutoff]
+        if len(above) + len(tied) <= limit:
+            return ranked
+
+        try:
+            chosen = await tiebreaker.choose_related_topics(
+                title=title,
+                summary=summary,
+                candidates=[c['topic'] for c in tied],
+                count=limit - len(above)
+            )
+        except Exception as e:
+            print(f"⚠️ Related-topic tiebreak failed, keeping link order: {e}")
+            return ranked
+
+        by_topic = {c['topic']: c for c in tied}
+        picked = [by_topic[t] for t in chosen if t in by_topic]
+        rest = [c for c in tied if c not in picked]
+        return above + picked + rest
@@ -5,7 +5,25 @@ Extracts article content, summary, sections, and text.
 import requests
 from bs4 import BeautifulSoup
 from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
 import re
+from app.services.entity_extractor import EntityExtractor
+
+
+WIKIPEDIA_ARTICLE_PREFIX = "https://en.wikipedia.org/wiki/"
+
+
+def normalize_article_url(url: str) -> str:
+    """
+    Canonical form of a Wikipedia article URL, used for storage and comparison.
+    Pasted URLs ("Café", "C++") and hrefs ("Caf%C3%A9", "C%2B%2B") map to the
+    same string: fragment dropped, spaces as underscores, title percent-encoded.
+    """
+    url = url.strip().split('#')[0]
+    if not url.startswith(WIKIPEDIA_ARTICLE_PREFIX):
+        return url
+    title = unquote(url[len(WIKIPEDIA_ARTICLE_PREFIX):]).replace(' ', '_')
+    return WIKIPEDIA_ARTICLE_PREFIX + quote(title, safe="_()',!-.~/:")
 
 
 class WikipediaScraper:
@@ -28,9 +46,9 @@ class WikipediaScraper:
             raise ValueError("URL must be a Wikipedia article (https://en.wikipedia.org/wiki/...)")
         return True
     
-    def fetch_page(self) -> BeautifulSoup:
+    def fetch_html(self) -> str:
         """
-        Fetch and parse Wikipedia page HTML.
+        Fetch Wikipedia page HTML without parsing it (I/O only).
         """
         try:
             headers = {
@@ -40,12 +58,30 @@ class WikipediaScraper:
             response.raise_for_status()
             
             self.raw_html = response.text
-            self.soup = BeautifulSoup(self.raw_html, 'html.parser')
-            return self.soup
+            return self.raw_html
         
         except requests.RequestException as e:
             raise Exception(f"Failed to fetch Wikipedia page: {str(e)}")
     
+    def fetch_page(self) -> BeautifulSoup:
+        """
+        Fetch and parse Wikipedia page HTML.
+        """
+        self.fetch_html()
+        self.soup = BeautifulSoup(self.raw_html, 'html.parser')
+        return self.soup
+    
+    @classmethod
+    def from_html(cls, url: str, raw_html: str) -> "WikipediaScraper":
+        """
+        Build a scraper from previously stored HTML.
+        Used to re-read cached articles without fetching them again.
+        """
+        scraper = cls(url)
+        scraper.raw_html = raw_html
+        scraper.soup = BeautifulSoup(raw_html, 'html.parser')
+        return scraper
+    
     def extract_title(self) -> str:
         """
         Extract article title.
@@ -109,6 +145,89 @@ class WikipediaScraper:
         
         return '\n\n'.join(paragraphs)
     
+    def extract_links(self, limit: int = 500) -> List[Dict]:
+        """
+        Extract internal article links from the article body.
+        Returns one entry per target article, in order of first appearance:
+        {title, url, lead_count, total_count}. Links in the lead (before the
+        first h2) are counted separately. Namespaced pages (File:, Help:, ...),
+        navboxes and reference lists are skipped.
+        """
+        content_div = self.soup.find('div', {'id': 'mw-content-text'})
+        if not content_div:
+            return []
+        
+        skip_classes = {'navbox', 'reflist', 'references', 'hatnote', 'metadata', 'mw-editsection'}
+        own_url = normalize_article_url(self.url)
+        
+        links: Dict[str, Dict] = {}
+        in_lead = True
+        for element in content_div.find_all(['a', 'h2']):
+            if element.name == 'h2':
+                in_lead = False
+                continue
+            
+            href = element.get('href', '')
+            if not href.startswith('/wiki/'):
+                continue
+            path = href.split('#')[0]
+            name = unquote(path[len('/wiki/'):])
+            if not name or ':' in name or name == 'Main_Page':
+                continue
+            url = normalize_article_url('https://en.wikipedia.org' + path)
+            if url == own_url:
+                continue
+            if any(
+                skip_classes.intersection(parent.get('class') or [])
+                for parent in element.parents
+                if parent is not content_div
+            ):
+                continue
+            
+            if len(url) > 500:  # Longer than the stored URL columns
+                continue
+            entry = links.get(url)
+            if entry is None:
+                if len(links) >= limit:
+                    continue
+                entry = links[url] = {
+                    'title': name.replace('_', ' '),
+                    'url': url,
+                    'lead_count': 0,
+                    'total_count': 0
+                }
+            entry['total_count'] += 1
+            if in_lead:
+                entry['lead_count'] += 1
+        
+        return list(links.values())
+    
+    def extract_section_text(self, section_title: str) -> str:
+        """
+        Extract paragraph text under a single section heading.
+        Returns an empty string if the section is not found.
+        """
+        wanted = section_title.strip().lower()
+        for heading in self.soup.find_all(['h2', 'h3']):
+            heading_text = re.sub(r'\[edit\]', '', heading.get_text()).strip()
+            if heading_text.lower() != wanted:
+                continue
+            
+            # Collect paragraphs until the next heading of the same or higher level
+            stop_tags = ['h2'] if heading.name == 'h2' else ['h2', 'h3']
+            paragraphs = []
+            for element in heading.find_all_next(['p'] + stop_tags):
+                if element.name in stop_tags:
+                    break
+                text = element.get_text().strip()
+                if text and len(text) > 30:
+                    text = re.sub(r'\[\d+\]', '', text)
+                    text = re.sub(r'\s+', ' ', text)
+                    paragraphs.append(text)
+            return '\n\n'.join(paragraphs)
+        
+        return ""
+    
     def scrape(self) -> Dict:
         """
         Main scraping method.
@@ -124,3 +243,39 @@ class WikipediaScraper:
             'full_text': self.extract_full_text(),
             'raw_html': self.raw_html
         }
+
+
+# ================= CPU STAGES ================= #
+# Module-level functions so they can run in a process pool: they take the
+# raw HTML string and return plain dicts / strings.
+
+def parse_article(url: str, raw_html: str) -> Dict:
+    """
+    Parse article HTML and extract entities and internal links.
+    Returns the same fields as WikipediaScraper.scrape() (minus raw_html)
+    plus 'entities' and 'links'.
+    """
+    scraper = WikipediaScraper.from_html(url, raw_html)
+    full_text = scraper.extract_full_text()
+    sections = scraper.extract_sections()
+    
+    return {
+        'title': scraper.extract_title(),
+        'summary': scraper.extract_summary(),
+        'sections': sections,
+        'full_text': full_text,
+        'entities': EntityExtractor.extract_entities(full_text, sections),
+        'links': scraper.extract_links()
+    }
+
+
+def extract_article_text(url: str, raw_html: str, section: Optional[str] = None) -> str:
+    """
+    Rebuild article text from stored HTML.
+    When a section is given, only that section's text is returned
+    ("" if the heading isn't found).
+    """
+    scraper = WikipediaScraper.from_html(url, raw_html)
+    if section:
+        return scraper.extract_section_text(section)
+    return scraper.extract_full_text()
@@ -0,0 +1,55 @@
+"""
+Backfill the link graph for quizzes stored before links were indexed.
+
+Re-parses each quiz's stored raw_html (no network fetch) and inserts its
+internal wiki links into article_links, so co-citation and backlink scores
+cover the whole history.
+
+Usage (from backend/):
+    python scripts/backfill_links.py
+"""
+import asyncio
+import os
+import sys
+
+from sqlalchemy import select
+
+# Allow "python scripts/backfill_links.py" from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.connection import SessionLocal, engine  # noqa: E402
+from app.models.database import ArticleLink, Quiz, init_db  # noqa: E402
+from app.services.cpu_pool import run_cpu, shutdown_executor  # noqa: E402
+from app.services.scraper import WikipediaScraper  # noqa: E402
+
+
+def extract_links(url: str, raw_html: str):
+    return WikipediaScraper.from_html(url, raw_html).extract_links()
+
+
+async def backfill():
+    await init_db()
+    async with SessionLocal() as db:
+        indexed = select(ArticleLink.quiz_id).distinct()
+        rows = await db.execute(
+            select(Quiz.id, Quiz.url, Quiz.raw_html)
+            .where(Quiz.raw_html.is_not(None), Quiz.id.not_in(indexed))
+        )
+        for quiz_id, url, raw_html in rows.all():
+            links = await run_cpu(extract_links, url, raw_html)
+            for link in links:
+                db.add(ArticleLink(
+                    quiz_id=quiz_id,
+                    target_title=link['title'],
+                    target_url=link['url'],
+                    lead_count=link['lead_count'],
+                    total_count=link['total_count']
+                ))
+            await db.commit()
+            print(f"+ quiz {quiz_id}: {len(links)} links")
+    shutdown_executor()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
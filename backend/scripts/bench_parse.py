@@ -0,0 +1,77 @@
+"""
+Throughput benchmark for the CPU stages (HTML parsing + entity extraction).
+
+Parses a batch of Wikipedia articles inline and then with process pools of
+increasing size, checks every pool result matches the inline result, and
+reports articles per second for each pool size.
+
+Usage (from backend/):
+    python scripts/bench_parse.py ../sample_data/test_urls.txt --repeat 4
+
+Fetched HTML is cached under --cache-dir so repeated runs don't hit Wikipedia.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+
+# Allow "python scripts/bench_parse.py" from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.prefetcher import read_url_file  # noqa: E402
+from app.services.scraper import WikipediaScraper, parse_article  # noqa: E402
+
+
+def load_html(url: str, cache_dir: str) -> str:
+    path = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".html")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    html = WikipediaScraper(url).fetch_html()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return html
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark article parsing throughput")
+    parser.add_argument("url_file", help="Text file with one Wikipedia URL per line")
+    parser.add_argument("--repeat", type=int, default=2, help="Parse each article this many times")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cache-dir", default=".bench_html_cache")
+    args = parser.parse_args()
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    urls = read_url_file(args.url_file)
+    pages = [(url, load_html(url, args.cache_dir)) for url in urls] * args.repeat
+    print(f"{len(pages)} articles, {sum(len(html) for _, html in pages) / 1e6:.1f} MB of HTML")
+
+    start = time.perf_counter()
+    expected = [parse_article(url, html) for url, html in pages]
+    inline_seconds = time.perf_counter() - start
+    print(f"inline     : {len(pages) / inline_seconds:6.1f} articles/s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            list(pool.map(abs, range(workers)))  # Start worker processes before timing
+            start = time.perf_counter()
+            results = list(pool.map(parse_article, *zip(*pages)))
+            seconds = time.perf_counter() - start
+
+        assert results == expected, "process-pool results differ from inline results"
+        print(
+            f"{workers:2d} workers : {len(pages) / seconds:6.1f} articles/s "
+            f"({inline_seconds / seconds:.2f}x inline)"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
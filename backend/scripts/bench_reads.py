@@ -0,0 +1,79 @@
+"""
+Concurrency benchmark for the quiz read endpoints.
+
+Fires concurrent GETs at /api/quiz/history and /api/quiz/{id} and reports
+throughput and latency percentiles. Run it against the same database before
+and after a change to compare.
+
+Usage (from backend/):
+    # Start the server with the cache disabled so reads hit the database
+    CACHE_BACKEND=none CACHE_LOCAL_MAX_ITEMS=0 uvicorn app.main:app --workers 1
+
+    python scripts/bench_reads.py --base-url http://localhost:8000 \\
+        --concurrency 50 --requests 2000
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import argparse
+import statistics
+import time
+
+import requests
+
+
+def run_endpoint(base_url: str, path: str, concurrency: int, total: int) -> Dict:
+    """
+    Hit one endpoint `total` times with `concurrency` parallel clients.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def one_request(_: int) -> float:
+        start = time.perf_counter()
+        response = session.get(base_url + path, timeout=30)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies: List[float] = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": total,
+        "concurrency": concurrency,
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 1),
+        "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1),
+        "p99_ms": round(1000 * latencies[int(0.99 * (len(latencies) - 1))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quiz read endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--quiz-id", type=int, default=None, help="Defaults to the newest quiz")
+    args = parser.parse_args()
+
+    history = requests.get(args.base_url + "/api/quiz/history", timeout=30).json()
+    quiz_id = args.quiz_id or (history[0]["id"] if history else None)
+    if quiz_id is None:
+        raise SystemExit("No quizzes found; generate at least one quiz first")
+
+    for path in ["/api/quiz/history", f"/api/quiz/{quiz_id}"]:
+        print(run_endpoint(args.base_url, path, args.concurrency, args.requests))
+
+    try:
+        print(requests.get(args.base_url + "/metrics", timeout=30).json().get("db_pool"))
+    except (requests.RequestException, ValueError):
+        pass  # Older builds have no /metrics endpoint
+
+
+if __name__ == "__main__":
+    main()
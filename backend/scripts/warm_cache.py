@@ -0,0 +1,76 @@
+"""
+Warm the quiz cache from a file of Wikipedia URLs.
+
+Either queues the URLs on a running server (low priority, within the
+prefetch budget) or generates them directly in this process.
+
+Usage (from backend/):
+    # Queue on a running server (needs its PROFILING_TOKEN)
+    python scripts/warm_cache.py ../sample_data/test_urls.txt --base-url http://localhost:8000 --token <token>
+
+    # Generate in-process, one URL at a time (uses .env settings)
+    python scripts/warm_cache.py ../sample_data/test_urls.txt
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import requests
+
+# Allow "python scripts/warm_cache.py" from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.prefetcher import read_url_file  # noqa: E402
+
+
+def warm_remote(base_url: str, token: str, urls):
+    response = requests.post(
+        f"{base_url}/api/quiz/warm",
+        json={"urls": urls},
+        headers={"X-Debug-Token": token},
+        timeout=30
+    )
+    response.raise_for_status()
+    print(response.json())
+
+
+async def warm_local(urls):
+    from app.database.connection import SessionLocal, engine
+    from app.models.database import init_db
+    from app.services.quiz_builder import create_quiz, find_existing_quiz
+
+    await init_db()
+    for url in urls:
+        async with SessionLocal() as db:
+            try:
+                if await find_existing_quiz(url, db):
+                    print(f"= {url} (already cached)")
+                    continue
+                response = await create_quiz(url, db)
+                print(f"+ {url} -> quiz {response.id}")
+            except Exception as e:
+                await db.rollback()
+                print(f"! {url}: {e}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the quiz cache from a URL file")
+    parser.add_argument("url_file", help="Text file with one Wikipedia URL per line")
+    parser.add_argument("--base-url", default=None, help="Queue on this server instead of generating locally")
+    parser.add_argument("--token", default="", help="The server's PROFILING_TOKEN (with --base-url)")
+    args = parser.parse_args()
+
+    urls = read_url_file(args.url_file)
+    if not urls:
+        raise SystemExit("No Wikipedia URLs found in file")
+
+    if args.base_url:
+        warm_remote(args.base_url.rstrip("/"), args.token, urls)
+    else:
+        asyncio.run(warm_local(urls))
+
+
+if __name__ == "__main__":
+    main()
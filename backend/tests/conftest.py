@@ -0,0 +1,36 @@
+"""
+Shared test setup.
+Settings are read when app modules are imported, so the test configuration
+is set before any test module imports the app.
+"""
+import asyncio
+import os
+
+import pytest
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["GEMINI_API_KEY"] = "test-key"
+os.environ["CACHE_BACKEND"] = "local"
+os.environ["CPU_POOL_WORKERS"] = "0"
+
+
+@pytest.fixture
+def fresh_db():
+    """
+    Empty schema and empty quiz cache for a test that touches the database.
+    The in-memory SQLite database lives on one shared connection, so it
+    survives across the asyncio.run() calls made by each test.
+    """
+    from app.database.connection import Base, engine
+    from app.services.cache import quiz_cache, LocalCacheBackend, LRUCache
+    import app.models.database  # noqa: F401  (registers the tables)
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(reset())
+    quiz_cache.backend = LocalCacheBackend()
+    if quiz_cache.local is not None:
+        quiz_cache.local = LRUCache(quiz_cache.local.max_items, quiz_cache.local.ttl)
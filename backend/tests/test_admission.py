@@ -0,0 +1,160 @@
+"""
+Tests for generation admission control (concurrency cap, queueing, shedding).
+"""
+import asyncio
+
+import pytest
+
+from app.services.admission import (
+    AdmissionController,
+    QueueFullError,
+    LIVE_PRIORITY,
+    BACKGROUND_PRIORITY
+)
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event, priority: int = LIVE_PRIORITY):
+    async with controller.admit(priority):
+        await release.wait()
+
+
+async def settle():
+    """Let queued tasks run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_concurrency_then_queues():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(controller, release))
+        second = asyncio.create_task(hold(controller, release))
+        await settle()
+        assert controller.snapshot()["active"] == 1
+        assert controller.queue_depth == 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert controller.snapshot()["active"] == 0
+        assert controller.stats["admitted"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, release)) for _ in range(2)]
+        await settle()
+
+        with pytest.raises(QueueFullError) as excinfo:
+            async with controller.admit():
+                pass
+        assert excinfo.value.retry_after >= 1
+        assert controller.stats["shed_queue_full"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_live_request_evicts_queued_background_work():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        background = asyncio.create_task(hold(controller, release, BACKGROUND_PRIORITY))
+        await settle()
+
+        live = asyncio.create_task(hold(controller, release, LIVE_PRIORITY))
+        await settle()
+        with pytest.raises(QueueFullError):
+            await background
+        assert controller.stats["evicted"] == 1
+
+        release.set()
+        await asyncio.gather(running, live)
+        assert controller.snapshot()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_background_work_cannot_evict_live_requests():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, release)) for _ in range(2)]
+        await settle()
+
+        with pytest.raises(QueueFullError):
+            async with controller.admit(BACKGROUND_PRIORITY):
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_sheds_waiter():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        await settle()
+
+        with pytest.raises(QueueFullError):
+            async with controller.admit():
+                pass
+        assert controller.stats["shed_timeout"] == 1
+        assert controller.queue_depth == 0
+
+        release.set()
+        await running
+        assert controller.snapshot()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_frees_its_queue_entry():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        waiting = asyncio.create_task(hold(controller, release))
+        await settle()
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert controller.queue_depth == 0
+
+        release.set()
+        await running
+        assert controller.snapshot()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancellation_wins_over_eviction():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        background = asyncio.create_task(hold(controller, release, BACKGROUND_PRIORITY))
+        await settle()
+
+        # Cancelled while queued, then evicted before the cancellation is delivered
+        background.cancel()
+        assert controller._evict_lower_than(LIVE_PRIORITY)
+        with pytest.raises(asyncio.CancelledError):
+            await background
+
+        release.set()
+        await running
+        assert controller.snapshot()["active"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,149 @@
+"""
+Tests for the two-tier quiz cache and cache invalidation on delete.
+"""
+import asyncio
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import (
+    CacheBackend,
+    LocalCacheBackend,
+    LRUCache,
+    QuizCache,
+    NOT_FOUND,
+    HISTORY_KEY,
+    quiz_cache,
+    quiz_key,
+    quiz_url_key
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+
+def make_cache(**overrides) -> QuizCache:
+    options = dict(ttl=300, negative_ttl=30, local_max_items=10, local_ttl=5)
+    options.update(overrides)
+    return QuizCache(backend=LocalCacheBackend(), **options)
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache(max_items=10, ttl=5)
+    lru.set("a", 1)
+    clock.now += 4
+    assert lru.get("a") == 1
+    clock.now += 2
+    assert lru.get("a") is None
+
+
+def test_lru_ttl_is_capped_at_local_ttl(clock):
+    lru = LRUCache(max_items=10, ttl=5)
+    lru.set("a", 1, ttl=300)
+    clock.now += 6
+    assert lru.get("a") is None
+
+
+def test_lru_evicts_least_recently_used(clock):
+    lru = LRUCache(max_items=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")  # "b" is now least recently used
+    lru.set("c", 3)
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+
+def test_shared_hit_fills_local_tier(clock):
+    cache = make_cache()
+    asyncio.run(cache.set("k", {"v": 1}))
+    cache.local.delete("k")
+
+    assert asyncio.run(cache.get("k")) == {"v": 1}
+    assert cache.stats["shared_hits"] == 1
+    assert asyncio.run(cache.get("k")) == {"v": 1}
+    assert cache.stats["local_hits"] == 1
+
+
+def test_negative_entries_expire_after_negative_ttl(clock):
+    cache = make_cache(local_max_items=0)  # Shared tier only
+    asyncio.run(cache.set_not_found("quiz:1"))
+    assert asyncio.run(cache.get("quiz:1")) is NOT_FOUND
+
+    clock.now += 31
+    assert asyncio.run(cache.get("quiz:1")) is None
+
+
+def test_set_overwrites_negative_entry(clock):
+    cache = make_cache()
+    asyncio.run(cache.set_not_found("quiz:1"))
+    asyncio.run(cache.set("quiz:1", {"id": 1}))
+    assert asyncio.run(cache.get("quiz:1")) == {"id": 1}
+
+
+def test_delete_invalidates_both_tiers(clock):
+    cache = make_cache()
+    asyncio.run(cache.set("a", 1))
+    asyncio.run(cache.set("b", 2))
+    asyncio.run(cache.delete("a", "b"))
+    assert asyncio.run(cache.get("a")) is None
+    assert asyncio.run(cache.get("b")) is None
+
+
+def test_backend_errors_are_treated_as_misses():
+    class BrokenBackend(LocalCacheBackend):
+        async def get(self, key):
+            raise ConnectionError("down")
+
+    cache = QuizCache(BrokenBackend(), ttl=300, negative_ttl=30, local_max_items=0, local_ttl=5)
+    assert asyncio.run(cache.get("k")) is None
+    assert cache.stats["errors"] == 1
+
+
+def test_delete_quiz_invalidates_cached_entries():
+    from app.database.connection import SessionLocal
+    from app.models.database import Quiz, init_db
+    from app.routes.quiz import delete_quiz
+
+    url = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+    async def scenario():
+        await init_db()
+        async with SessionLocal() as db:
+            quiz = Quiz(url=url, title="Alan Turing")
+            db.add(quiz)
+            await db.commit()
+            quiz_id = quiz.id
+
+        await quiz_cache.set(quiz_key(quiz_id), {"id": quiz_id})
+        await quiz_cache.set(quiz_url_key(url), quiz_id)
+        await quiz_cache.set(HISTORY_KEY, [{"id": quiz_id}])
+
+        async with SessionLocal() as db:
+            await delete_quiz(quiz_id, db)
+
+        return [
+            await quiz_cache.get(quiz_key(quiz_id)),
+            await quiz_cache.get(quiz_url_key(url)),
+            await quiz_cache.get(HISTORY_KEY)
+        ]
+
+    assert asyncio.run(scenario()) == [None, None, None]
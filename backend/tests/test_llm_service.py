@@ -0,0 +1,170 @@
+"""
+Tests for LLM response handling: incremental JSON parsing, streamed usage
+accounting, early stop and the latency model.
+No network calls: the Gemini model is replaced by a scripted stream.
+"""
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableGenerator
+
+from app.services import llm_service
+from app.services.llm_service import (
+    LatencyModel,
+    QuizGenerator,
+    MIN_TOKENS_PER_QUESTION,
+    MIN_TOKENS_PER_SECOND
+)
+
+
+def make_question(n: int) -> dict:
+    return {
+        "question": f"Question {n}?",
+        "options": ["A", "B", "C", "D"],
+        "answer": "A",
+        "difficulty": "easy",
+        "explanation": "Because {braces} and \"quotes\" are fine inside strings."
+    }
+
+
+def scripted_generator(pieces, output_tokens_per_chunk: int = 10) -> QuizGenerator:
+    """
+    QuizGenerator whose LLM streams `pieces` as chunks.
+    Each chunk reports its own usage delta, as langchain-google-genai 2.x does.
+    """
+    async def stream(_inputs):
+        async for _ in _inputs:
+            pass
+        for piece in pieces:
+            yield AIMessageChunk(
+                content=piece,
+                usage_metadata={
+                    "input_tokens": 0,
+                    "output_tokens": output_tokens_per_chunk,
+                    "total_tokens": output_tokens_per_chunk
+                }
+            )
+
+    generator = QuizGenerator()
+    generator.llm = RunnableGenerator(stream)
+    return generator
+
+
+def split(text: str, size: int = 40):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture(autouse=True)
+def fresh_latency_model(monkeypatch):
+    monkeypatch.setattr(llm_service, "latency_model", LatencyModel())
+
+
+# ================= INCREMENTAL PARSING ================= #
+
+def test_extract_json_objects_returns_complete_objects_and_resume_point():
+    generator = QuizGenerator()
+    first = json.dumps(make_question(1))
+    text = "[" + first + ", " + '{"question": "unfinished'
+
+    objects, resume = generator._extract_json_objects(text, 1)
+    assert objects == [make_question(1)]
+    assert resume == 1 + len(first)
+
+    text += '", "answer": "B"}]'
+    objects, resume = generator._extract_json_objects(text, resume)
+    assert objects == [{"question": "unfinished", "answer": "B"}]
+    assert text[resume:] == "]"
+
+
+def test_extract_json_objects_handles_nested_objects():
+    generator = QuizGenerator()
+    text = '[{"a": {"b": [1, {"c": 2}]}}, {"d": "}"}]'
+    objects, _ = generator._extract_json_objects(text, 1)
+    assert objects == [{"a": {"b": [1, {"c": 2}]}}, {"d": "}"}]
+
+
+def test_extract_json_objects_without_objects_keeps_position():
+    generator = QuizGenerator()
+    objects, resume = generator._extract_json_objects("[  ", 1)
+    assert objects == []
+    assert resume == 1
+
+
+# ================= STREAMING ================= #
+
+def test_streamed_usage_is_summed_across_chunks():
+    questions = [make_question(n) for n in range(3)]
+    pieces = split(json.dumps(questions))
+    generator = scripted_generator(pieces, output_tokens_per_chunk=10)
+
+    result = asyncio.run(generator.generate_quiz("Title", "Content", num_questions=3))
+
+    assert result == questions
+    assert generator.tokens_used == 10 * len(pieces)
+
+
+def test_stream_stops_once_enough_questions_arrive():
+    questions = [make_question(n) for n in range(5)]
+    pieces = split(json.dumps(questions))
+    generator = scripted_generator(pieces)
+
+    result = asyncio.run(generator.generate_quiz("Title", "Content", num_questions=2))
+
+    assert result == questions[:2]
+    assert generator.tokens_used < 10 * len(pieces)
+
+
+def test_combined_keeps_topics_that_follow_the_questions():
+    topics = ["Topic A", "Topic B", "Topic C"]
+    body = {"questions": [make_question(n) for n in range(4)], "related_topics": topics}
+    generator = scripted_generator(split(json.dumps(body)))
+
+    questions, result_topics = asyncio.run(
+        generator._generate_combined("Title", "Content", num_questions=2)
+    )
+
+    assert len(questions) == 2
+    assert result_topics == topics
+
+
+def test_combined_stops_early_when_topics_come_first():
+    topics = ["Topic A", "Topic B"]
+    body = {"related_topics": topics, "questions": [make_question(n) for n in range(5)]}
+    pieces = split(json.dumps(body))
+    generator = scripted_generator(pieces)
+
+    questions, result_topics = asyncio.run(
+        generator._generate_combined("Title", "Content", num_questions=2)
+    )
+
+    assert len(questions) == 2
+    assert result_topics == topics
+    assert generator.tokens_used < 10 * len(pieces)
+
+
+@pytest.mark.parametrize("output", [
+    "Sorry, I can't write a quiz about this article.",
+    '[{"question": "Cut off mid-object?", "options": ["A", "B"',
+])
+def test_unparseable_output_raises(output):
+    generator = scripted_generator(split(output))
+
+    with pytest.raises(ValueError):
+        asyncio.run(generator.generate_quiz("Title", "Content", num_questions=3))
+
+
+# ================= LATENCY MODEL ================= #
+
+def test_latency_model_estimates_have_floors():
+    model = LatencyModel()
+    for _ in range(50):
+        model.observe(num_questions=7, output_tokens=1, first_token_seconds=0.0, total_seconds=1000.0)
+
+    assert model.tokens_per_question >= MIN_TOKENS_PER_QUESTION
+    assert model.tokens_per_second >= MIN_TOKENS_PER_SECOND
+
+    plan = model.plan(content_length=20000, num_questions=7, max_output_tokens=2048)
+    assert plan["num_questions"] == 7
+    assert plan["max_output_tokens"] > 256
@@ -0,0 +1,55 @@
+"""
+Tests for the scrape -> LLM -> store pipeline (no network: fetch and LLM are patched).
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database.connection import SessionLocal
+from app.models.database import Quiz
+from app.services import quiz_builder
+from app.services.cache import quiz_cache, quiz_url_key
+from app.services.llm_service import QuizGenerator
+from app.services.scraper import WikipediaScraper
+
+URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+ARTICLE_HTML = """
+<html><body>
+<h1 id="firstHeading">Alan Turing</h1>
+<div id="mw-content-text">
+<p>Alan Turing was an English mathematician and computer scientist who formalised computation.</p>
+<h2>Career</h2>
+<p>Turing worked at Bletchley Park during the Second World War on breaking German ciphers.</p>
+</div>
+</body></html>
+"""
+
+
+@pytest.fixture
+def article(monkeypatch):
+    monkeypatch.setattr(WikipediaScraper, "fetch_html", lambda self: ARTICLE_HTML)
+
+
+def count_quizzes() -> int:
+    async def scenario():
+        async with SessionLocal() as db:
+            return await db.scalar(select(func.count(Quiz.id)))
+    return asyncio.run(scenario())
+
+
+def test_quiz_without_questions_is_not_stored(fresh_db, article, monkeypatch):
+    async def no_questions(self, title, content, num_questions=7):
+        return []
+
+    monkeypatch.setattr(QuizGenerator, "generate_quiz", no_questions)
+
+    async def scenario():
+        async with SessionLocal() as db:
+            await quiz_builder.create_quiz(URL, db)
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+    assert count_quizzes() == 0
+    assert asyncio.run(quiz_cache.get(quiz_url_key(URL))) is None